@@ -0,0 +1,135 @@
+# Exportiert das Rundenprotokoll (round_guesses) als CSV oder Parquet mit konstantem Speicherbedarf
+#
+# Die Zeilen werden über einen serverseitigen Cursor in Blöcken von --chunk-size gelesen und
+# blockweise geschrieben: CSV (mit Endung .gz komprimiert) oder Parquet mit einer Row Group je
+# Block (benötigt pyarrow). Der Zeitraum wird über die Partitionen eingegrenzt, es werden also nur
+# die betroffenen Monate gelesen.
+#
+# Beispiel (aus dem Projektverzeichnis):
+#   python analytics/export_round_guesses.py --dbname cityguesser --output guesses.csv.gz
+#   python analytics/export_round_guesses.py --since 2024-05-01 --until 2024-06-01 --output mai.parquet
+
+import argparse
+import csv
+import gzip
+import importlib.util
+import os
+import sys
+import time
+from datetime import date
+
+import psycopg2
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "script"))
+
+from database_connection import DB_CONFIG  # noqa: E402
+from guess_writer import COLUMNS  # noqa: E402
+
+
+# Parquet-Typen der Spalten (wie in SQL.txt); pyarrow wird nur für Parquet importiert
+def parquet_schema():
+    import pyarrow as pa
+
+    types = {
+        "played_at": pa.timestamp("us"),
+        "player": pa.int32(),
+        "challenge_id": pa.int32(),
+        "round": pa.int16(),
+        "points": pa.int16(),
+        "target_lat": pa.float64(),
+        "target_lon": pa.float64(),
+        "guess_lat": pa.float64(),
+        "guess_lon": pa.float64(),
+        "distance_km": pa.float64()
+    }
+    return pa.schema([(column, types.get(column, pa.string())) for column in COLUMNS])
+
+
+# Abfrage und Parameter für den Zeitraum [since, until) und optional einen Spielmodus
+def build_query(since=None, until=None, game_mode=None):
+    conditions, params = [], []
+    if since:
+        conditions.append("played_at >= %s")
+        params.append(since)
+    if until:
+        conditions.append("played_at < %s")
+        params.append(until)
+    if game_mode:
+        conditions.append("game_mode = %s")
+        params.append(game_mode)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    return f"SELECT {', '.join(COLUMNS)} FROM round_guesses{where}", params
+
+
+# Liefert die Zeilen blockweise aus einem serverseitigen Cursor
+def read_chunks(conn, query, params, chunk_size):
+    with conn.cursor(name="export_round_guesses") as cur:
+        cur.itersize = chunk_size
+        cur.execute(query, params)
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+
+
+def write_csv(chunks, path):
+    opener = gzip.open if path.endswith(".gz") else open
+    rows = 0
+    with opener(path, "wt", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for chunk in chunks:
+            writer.writerows(chunk)
+            rows += len(chunk)
+    return rows
+
+
+def write_parquet(chunks, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema()
+    rows = 0
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for chunk in chunks:
+            columns = list(zip(*chunk))
+            writer.write_table(pa.Table.from_arrays([pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema))
+            rows += len(chunk)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportiert round_guesses als CSV oder Parquet")
+    parser.add_argument("--dbname", default=os.environ.get("PGDATABASE", DB_CONFIG["dbname"]))
+    parser.add_argument("--user", default=os.environ.get("PGUSER", DB_CONFIG["user"]))
+    parser.add_argument("--password", default=os.environ.get("PGPASSWORD", DB_CONFIG["password"]))
+    parser.add_argument("--host", default=os.environ.get("PGHOST", DB_CONFIG["host"]))
+    parser.add_argument("--port", default=os.environ.get("PGPORT", DB_CONFIG["port"]))
+    parser.add_argument("--output", required=True, help="Zieldatei (.csv, .csv.gz oder .parquet)")
+    parser.add_argument("--format", choices=["csv", "parquet"], help="Standard: aus der Dateiendung")
+    parser.add_argument("--since", type=date.fromisoformat, help="ab Datum (einschließlich)")
+    parser.add_argument("--until", type=date.fromisoformat, help="bis Datum (ausschließlich)")
+    parser.add_argument("--game-mode", help='z. B. "Länder (Mittel)"')
+    parser.add_argument("--chunk-size", type=int, default=50000, help="Zeilen je Block")
+    args = parser.parse_args()
+
+    output_format = args.format or ("parquet" if args.output.endswith(".parquet") else "csv")
+    if output_format == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        parser.error("Für Parquet wird pyarrow benötigt (pip install pyarrow)")
+
+    query, params = build_query(args.since, args.until, args.game_mode)
+    start = time.perf_counter()
+    conn = psycopg2.connect(dbname=args.dbname, user=args.user, password=args.password, host=args.host, port=args.port)
+    try:
+        chunks = read_chunks(conn, query, params, args.chunk_size)
+        rows = write_parquet(chunks, args.output) if output_format == "parquet" else write_csv(chunks, args.output)
+    finally:
+        conn.close()
+
+    print(f"{rows} Runden in {time.perf_counter() - start:.1f} s -> {args.output} ({os.path.getsize(args.output) / 1024 / 1024:.1f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
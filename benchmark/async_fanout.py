@@ -0,0 +1,141 @@
+# Latenzvergleich: unabhängige Abfragen nacheinander (psycopg2) gegen gleichzeitig (asyncpg)
+#
+# Misst die Abfragepaare, die async_database zusammenfasst, ohne Caches und ohne lokale
+# Distanzberechnung, also den reinen Datenbankweg:
+#   reveal_country    ST_Distance zum Land und GeoJSON in zufälliger Vereinfachungsstufe
+#   player_overview   letzte 10 Spiele und Statistiken
+#   leaderboard_view  Top-10 und Rang
+# Sequentiell über eine psycopg2-Verbindung wie database_connection, gleichzeitig über einen
+# asyncpg-Pool mit asyncio.gather wie async_database. Ausgegeben werden p50/p95 je Paar.
+#
+# Beispiel (aus dem Projektverzeichnis):
+#   python benchmark/async_fanout.py --dbname cityguesser --iterations 200
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+import asyncpg
+import numpy as np
+import psycopg2
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "script"))
+
+import database_connection as db  # noqa: E402
+import geojson_cache  # noqa: E402
+from async_database import numbered  # noqa: E402
+from leaderboard import RANK_QUERY, STATS_QUERY, TOP_QUERY, mode_key  # noqa: E402
+
+GEOJSON_BY_NAME = db.GEOJSON_QUERY + " WHERE name = %s"
+
+
+# Je Iteration ein Abfragepaar [(SQL, Parameter, nur eine Zeile), ...] pro Variante
+def sample_pairs(cur, iterations, seed):
+    rng = random.Random(seed)
+    cur.execute("SELECT name FROM countries WHERE geom IS NOT NULL")
+    countries = [name for (name,) in cur.fetchall()]
+    cur.execute("SELECT player, game_mode FROM player_stats")
+    players = cur.fetchall() or [(0, mode_key("Städte", "Mittel"))]
+
+    pairs = {"reveal_country": [], "player_overview": [], "leaderboard_view": []}
+    for _ in range(iterations):
+        country = rng.choice(countries)
+        tolerance, decimals = geojson_cache.SIMPLIFY_LEVELS[rng.choice(list(geojson_cache.SIMPLIFY_LEVELS))]
+        pairs["reveal_country"].append([
+            (db.DISTANCE_QUERY, (rng.uniform(-180, 180), rng.uniform(-60, 70), country), True),
+            (GEOJSON_BY_NAME, (tolerance, decimals, country), True)
+        ])
+        player, game_mode = rng.choice(players)
+        pairs["player_overview"].append([
+            (db.HISTORY_QUERY, (player,), False),
+            (STATS_QUERY, (player,), False)
+        ])
+        pairs["leaderboard_view"].append([
+            (TOP_QUERY, (game_mode, 10), False),
+            (RANK_QUERY, (game_mode, player), True)
+        ])
+    return pairs
+
+
+def run_sequential(conn, pairs):
+    durations = []
+    with conn.cursor() as cur:
+        for pair in pairs:
+            start = time.perf_counter()
+            for query, params, fetch_one in pair:
+                cur.execute(query, params)
+                cur.fetchone() if fetch_one else cur.fetchall()
+            durations.append(time.perf_counter() - start)
+    conn.rollback()
+    return durations
+
+
+async def run_concurrent(pool, pairs):
+    async def fetch(query, params, fetch_one):
+        async with pool.acquire() as conn:
+            if fetch_one:
+                return await conn.fetchrow(numbered(query), *params)
+            return await conn.fetch(numbered(query), *params)
+
+    durations = []
+    for pair in pairs:
+        start = time.perf_counter()
+        await asyncio.gather(*(fetch(*request) for request in pair))
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+async def run_all(db_config, pairs):
+    pool = await asyncpg.create_pool(
+        database=db_config["dbname"], user=db_config["user"], password=db_config["password"],
+        host=db_config["host"], port=int(db_config["port"]), min_size=2, max_size=2
+    )
+    try:
+        await run_concurrent(pool, [requests[0] for requests in pairs.values()])
+        return {name: await run_concurrent(pool, requests) for name, requests in pairs.items()}
+    finally:
+        await pool.close()
+
+
+def percentiles(durations):
+    values = np.array(durations) * 1000
+    return np.percentile(values, 50), np.percentile(values, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sequentielle gegen gleichzeitige Datenbankabfragen")
+    parser.add_argument("--dbname", default=os.environ.get("PGDATABASE", db.DB_CONFIG["dbname"]))
+    parser.add_argument("--user", default=os.environ.get("PGUSER", db.DB_CONFIG["user"]))
+    parser.add_argument("--password", default=os.environ.get("PGPASSWORD", db.DB_CONFIG["password"]))
+    parser.add_argument("--host", default=os.environ.get("PGHOST", db.DB_CONFIG["host"]))
+    parser.add_argument("--port", default=os.environ.get("PGPORT", db.DB_CONFIG["port"]))
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    db_config = dict(dbname=args.dbname, user=args.user, password=args.password, host=args.host, port=args.port)
+    conn = psycopg2.connect(**db_config)
+    try:
+        with conn.cursor() as cur:
+            pairs = sample_pairs(cur, args.iterations, args.seed)
+        # Je ein Durchlauf zum Aufwärmen von Verbindung und Plan-Cache
+        run_sequential(conn, [requests[0] for requests in pairs.values()])
+        sequential = {name: run_sequential(conn, requests) for name, requests in pairs.items()}
+    finally:
+        conn.close()
+    concurrent = asyncio.run(run_all(db_config, pairs))
+
+    print(f"{args.iterations} Iterationen je Abfragepaar, Zeiten in ms")
+    print(f"{'':18s} {'seq p50':>9s} {'seq p95':>9s} {'async p50':>10s} {'async p95':>10s} {'Faktor p50':>11s}")
+    for name in pairs:
+        seq_p50, seq_p95 = percentiles(sequential[name])
+        async_p50, async_p95 = percentiles(concurrent[name])
+        print(f"{name:18s} {seq_p50:9.2f} {seq_p95:9.2f} {async_p50:10.2f} {async_p95:10.2f} {seq_p50 / async_p50:11.2f}")
+
+
+if __name__ == "__main__":
+    main()
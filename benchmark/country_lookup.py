@@ -0,0 +1,89 @@
+# Benchmark für den räumlichen Länderindex (script/country_index.py)
+#
+# Misst Aufbauzeit, Einzelabfragen (lookup) und Massenabfragen (lookup_many) für zufällige
+# Punkte auf der Erdoberfläche (flächentreu verteilt) und für Punkte nahe Landesgrenzen.
+# Mit --compare werden die Ergebnisse gegen die Einzelprüfung aller Länder mit
+# CountryGeometry.contains geprüft (langsam, daher nur für eine Stichprobe).
+#
+# Beispiel (aus dem Projektverzeichnis):
+#   python benchmark/country_lookup.py --points 100000 --compare 2000
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "script"))
+
+import country_distance  # noqa: E402
+from country_index import CountryIndex  # noqa: E402
+
+
+# Gleichverteilte Punkte auf der Kugel
+def random_points(rng, n):
+    lats = np.degrees(np.arcsin(rng.uniform(-1.0, 1.0, n)))
+    lons = rng.uniform(-180.0, 180.0, n)
+    return lats, lons
+
+
+# Punkte in der Nähe zufälliger Eckpunkte der Ländergrenzen (ungünstigster Fall für das Gitter)
+def border_points(rng, countries, n, spread=0.2):
+    vertices = np.concatenate([starts for country in countries.values() for _, starts, _ in country.polygons])
+    picked = vertices[rng.integers(0, len(vertices), n)]
+    lats = np.clip(picked[:, 1] + rng.normal(0.0, spread, n), -90.0, 90.0)
+    lons = (picked[:, 0] + rng.normal(0.0, spread, n) + 180.0) % 360.0 - 180.0
+    return lats, lons
+
+
+def bench_single(index, lats, lons):
+    points = list(zip(lats.tolist(), lons.tolist()))
+    start = time.perf_counter()
+    for lat, lon in points:
+        index.lookup(lat, lon)
+    return (time.perf_counter() - start) / len(points) * 1e6
+
+
+def bench_bulk(index, lats, lons):
+    start = time.perf_counter()
+    index.lookup_many(lats, lons)
+    return (time.perf_counter() - start) / len(lats) * 1e6
+
+
+def compare(index, countries, lats, lons):
+    mismatches = 0
+    for lat, lon in zip(lats.tolist(), lons.tolist()):
+        expected = next((name for name, country in countries.items() if country.contains(lat, lon)), None)
+        if index.lookup(lat, lon) != expected:
+            mismatches += 1
+            print(f"Abweichung bei ({lat:.5f}, {lon:.5f}): Index {index.lookup(lat, lon)}, erwartet {expected}")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark für den räumlichen Länderindex")
+    parser.add_argument("--points", type=int, default=100000)
+    parser.add_argument("--compare", type=int, default=0, help="Anzahl Punkte für den Abgleich mit contains()")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    countries = country_distance.get_countries()
+
+    start = time.perf_counter()
+    index = CountryIndex(countries)
+    print(f"Aufbau: {(time.perf_counter() - start) * 1000:.0f} ms  {index.stats()}")
+
+    for label, (lats, lons) in [("zufällig", random_points(rng, args.points)), ("Grenznähe", border_points(rng, countries, args.points))]:
+        print(f"{label:10s} einzeln: {bench_single(index, lats, lons):6.2f} µs/Punkt  "
+              f"gesammelt: {bench_bulk(index, lats, lons):6.2f} µs/Punkt")
+
+    if args.compare:
+        for label, (lats, lons) in [("zufällig", random_points(rng, args.compare)), ("Grenznähe", border_points(rng, countries, args.compare))]:
+            print(f"Abgleich {label}: {compare(index, countries, lats, lons)} Abweichungen bei {args.compare} Punkten")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+# Lasttest für Spielablauf und Datenbankschicht ohne Browser
+#
+# Simuliert gleichzeitige Spieler als Threads (wie Streamlit-Sessions in einem Prozess):
+# Spielstart (fetch_game_data wie start_game), Klicks mit Distanz und Punkten, bei Ländern
+# die GeoJSON-Abfrage für die Auflösung und am Ende save_score_to_db. Ausgegeben werden
+# p50/p95/p99 je Operation, Durchsatz und Verbindungszahlen als JSON.
+#
+# Beispiel (aus dem Projektverzeichnis):
+#   python benchmark/load_test.py --dbname cityguesser --seed-schema --players 20 --games 5 --mode Länder
+#
+# --seed-schema spielt SQL.txt in die (leere) Datenbank ein und lädt die Orte mit
+# locations/load_locations.py.
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "script"))
+sys.path.insert(0, os.path.join(ROOT, "locations"))
+
+import database_connection as db  # noqa: E402
+import load_locations  # noqa: E402
+from geopy.distance import geodesic  # noqa: E402
+from scoring import calculate_score  # noqa: E402
+
+TABLES = {"Städte": "cities", "Länder": "countries", "Berge": "berge", "Gebäude": "gebaeude"}
+DIFFICULTIES = {"Leicht": "easy", "Mittel": "medium", "Schwer": "hard"}
+
+
+# Spielt SQL.txt ein und lädt anschließend alle Orte aus locations/*.csv
+def seed_schema(conn, sql_path):
+    with open(sql_path, encoding="utf-8") as f:
+        sql = f.read()
+    with conn.cursor() as cur:
+        cur.execute(sql)
+    conn.commit()
+    load_locations.load(conn, load_locations.TABLES)
+
+
+# Sammelt die Laufzeiten je Operation über alle Threads
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def measure(self, name, func, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self.errors[name] += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.samples[name].append(elapsed)
+
+    def summary(self, duration):
+        result = {}
+        for name, values in sorted(self.samples.items()):
+            ms = np.array(values) * 1000
+            result[name] = {
+                "count": len(values),
+                "errors": self.errors.get(name, 0),
+                "mean_ms": float(ms.mean()),
+                "p50_ms": float(np.percentile(ms, 50)),
+                "p95_ms": float(np.percentile(ms, 95)),
+                "p99_ms": float(np.percentile(ms, 99)),
+                "max_ms": float(ms.max()),
+                "throughput_per_s": len(values) / duration
+            }
+        return result
+
+
+# Fragt regelmäßig die Zahl der Server-Verbindungen ab
+class ConnectionMonitor(threading.Thread):
+    def __init__(self, db_config, interval=0.5):
+        super().__init__(daemon=True)
+        self.db_config = db_config
+        self.interval = interval
+        self.samples = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        import psycopg2
+        conn = psycopg2.connect(**self.db_config)
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            while not self._stop_event.is_set():
+                cur.execute("SELECT count(*) FROM pg_stat_activity WHERE datname = current_database()")
+                self.samples.append(cur.fetchone()[0])
+                self._stop_event.wait(self.interval)
+        conn.close()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def summary(self):
+        if not self.samples:
+            return {}
+        return {"max": max(self.samples), "mean": sum(self.samples) / len(self.samples), "samples": len(self.samples)}
+
+
+# Ein simulierter Spieler: spielt games Spiele mit zufälligen Klicks rund um das Ziel
+def play(player_index, args, recorder):
+    rng = random.Random(args.seed + player_index)
+    table_name = TABLES[args.mode]
+    difficulty = DIFFICULTIES[args.difficulty]
+    player_id = recorder.measure("log_in", db.log_in, f"bench_{player_index}")
+
+    for _ in range(args.games):
+        locations = recorder.measure("start_game", db.fetch_game_data, table_name, args.rounds, difficulty)
+        total = 0
+        for city in locations:
+            # Klick im Umkreis von ca. click_spread Grad um das Ziel
+            guess = (
+                max(-85.0, min(85.0, city["lat"] + rng.gauss(0, args.click_spread))),
+                (city["lon"] + rng.gauss(0, args.click_spread) + 180) % 360 - 180
+            )
+            if table_name == "countries":
+                if args.bypass_caches:
+                    distance = recorder.measure("calculate_dist_to_country", db.calculate_dist_to_country, guess, city["name"])
+                else:
+                    distance = recorder.measure(
+                        "calculate_dist_to_country", db.calculate_dist_to_country,
+                        guess, city["name"], city.get("name_en"), city.get("geojson", {}).get(6)
+                    )
+                if args.bypass_caches:
+                    db.get_geojson_cache().clear()
+                recorder.measure("get_country_geojson", db.get_country_geojson, city["name"])
+            else:
+                distance = recorder.measure("geodesic", lambda: geodesic(guess, (city["lat"], city["lon"])).kilometers)
+            total += recorder.measure("calculate_score", calculate_score, distance if distance is not None else 1e9)
+
+        recorder.measure("save_score_to_db", db.save_score_to_db, total, len(locations),
+                         f"{args.mode} ({args.difficulty})", player_id)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lasttest für City Guesser")
+    parser.add_argument("--dbname", default=os.environ.get("PGDATABASE", db.DB_CONFIG["dbname"]))
+    parser.add_argument("--user", default=os.environ.get("PGUSER", db.DB_CONFIG["user"]))
+    parser.add_argument("--password", default=os.environ.get("PGPASSWORD", db.DB_CONFIG["password"]))
+    parser.add_argument("--host", default=os.environ.get("PGHOST", db.DB_CONFIG["host"]))
+    parser.add_argument("--port", default=os.environ.get("PGPORT", db.DB_CONFIG["port"]))
+    parser.add_argument("--seed-schema", action="store_true", help="SQL.txt vorher in die leere Datenbank einspielen")
+    parser.add_argument("--players", type=int, default=10, help="gleichzeitige Spieler (Threads)")
+    parser.add_argument("--games", type=int, default=3, help="Spiele pro Spieler")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--mode", choices=TABLES, default="Städte")
+    parser.add_argument("--difficulty", choices=DIFFICULTIES, default="Mittel")
+    parser.add_argument("--pool-size", type=int, default=db.POOL_CONFIG["max_size"])
+    parser.add_argument("--click-spread", type=float, default=5.0)
+    parser.add_argument("--bypass-caches", action="store_true", help="Länderdistanz und GeoJSON immer über PostGIS")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=os.path.join(ROOT, "bench_results.json"))
+    args = parser.parse_args()
+
+    db.DB_CONFIG.update(dbname=args.dbname, user=args.user, password=args.password, host=args.host, port=args.port)
+    db.POOL_CONFIG["max_size"] = args.pool_size
+
+    if args.seed_schema:
+        import psycopg2
+        conn = psycopg2.connect(**db.DB_CONFIG)
+        try:
+            seed_schema(conn, os.path.join(ROOT, "SQL.txt"))
+        finally:
+            conn.close()
+
+    if not args.bypass_caches:
+        db.warm_up_geojson_cache()
+
+    recorder = Recorder()
+    monitor = ConnectionMonitor(db.DB_CONFIG)
+    monitor.start()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=play, args=(i, args, recorder)) for i in range(args.players)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    recorder.measure("score_writer_flush", db.get_score_writer().flush, 60)
+    duration = time.perf_counter() - start
+    monitor.stop()
+
+    games = args.players * args.games
+    result = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "config": {k: v for k, v in vars(args).items() if k != "password"},
+        "duration_s": duration,
+        "games": games,
+        "games_per_s": games / duration,
+        "operations": recorder.summary(duration),
+        "connections": {
+            "server": monitor.summary(),
+            "pool": db.get_pool_stats()
+        },
+        "score_writer": db.get_score_writer_stats()
+    }
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+
+    print(f"{games} Spiele in {duration:.2f} s ({result['games_per_s']:.1f} Spiele/s)")
+    for name, stats in result["operations"].items():
+        print(f"{name:28s} n={stats['count']:6d}  p50={stats['p50_ms']:8.2f} ms  p95={stats['p95_ms']:8.2f} ms  p99={stats['p99_ms']:8.2f} ms  Fehler={stats['errors']}")
+    print(f"Ergebnisse: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
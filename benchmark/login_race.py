@@ -0,0 +1,105 @@
+# Nebenläufigkeitstest für die Anmeldung (log_in / PLAYER_UPSERT_QUERY)
+#
+# Startet viele Threads mit eigener Verbindung, die sich per Barriere gleichzeitig mit einer
+# kleinen Zahl neuer Namen anmelden. Geprüft wird, dass jeder Name genau einmal in players steht
+# und alle Threads für denselben Namen dieselbe ID erhalten haben. Der Prozess-Cache von log_in
+# wird dabei umgangen, damit jede Anmeldung die Datenbank erreicht. Zum Schluss werden die
+# Testspieler wieder gelöscht.
+#
+# Beispiel (aus dem Projektverzeichnis):
+#   python benchmark/login_race.py --dbname cityguesser --logins 500 --names 20
+
+import argparse
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+import psycopg2
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "script"))
+
+import database_connection as db  # noqa: E402
+
+
+def race(db_config, names, logins, threads):
+    barrier = threading.Barrier(threads)
+    results = defaultdict(set)
+    errors = []
+    lock = threading.Lock()
+
+    def worker(offset):
+        conn = psycopg2.connect(**db_config)
+        try:
+            barrier.wait()
+            for i in range(offset, logins, threads):
+                name = names[i % len(names)]
+                with conn.cursor() as cur:
+                    cur.execute(db.PLAYER_UPSERT_QUERY, (name,))
+                    player_id = cur.fetchone()[0]
+                conn.commit()
+                with lock:
+                    results[name].add(player_id)
+        except Exception as e:
+            with lock:
+                errors.append(repr(e))
+        finally:
+            conn.close()
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return results, errors, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gleichzeitige Anmeldungen ohne doppelte Spieler")
+    parser.add_argument("--dbname", default=os.environ.get("PGDATABASE", db.DB_CONFIG["dbname"]))
+    parser.add_argument("--user", default=os.environ.get("PGUSER", db.DB_CONFIG["user"]))
+    parser.add_argument("--password", default=os.environ.get("PGPASSWORD", db.DB_CONFIG["password"]))
+    parser.add_argument("--host", default=os.environ.get("PGHOST", db.DB_CONFIG["host"]))
+    parser.add_argument("--port", default=os.environ.get("PGPORT", db.DB_CONFIG["port"]))
+    parser.add_argument("--logins", type=int, default=500, help="Anmeldungen insgesamt")
+    parser.add_argument("--names", type=int, default=20, help="verschiedene neue Namen")
+    parser.add_argument("--threads", type=int, default=50, help="gleichzeitige Verbindungen")
+    args = parser.parse_args()
+
+    db_config = dict(dbname=args.dbname, user=args.user, password=args.password, host=args.host, port=args.port)
+    prefix = f"race_{uuid.uuid4().hex[:8]}_"
+    names = [f"{prefix}{i}"[:20] for i in range(args.names)]
+
+    results, errors, duration = race(db_config, names, args.logins, args.threads)
+
+    conn = psycopg2.connect(**db_config)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT name, count(*) FROM players WHERE name = ANY(%s) GROUP BY name", (names,))
+            rows = dict(cur.fetchall())
+            cur.execute("DELETE FROM players WHERE name = ANY(%s)", (names,))
+        conn.commit()
+    finally:
+        conn.close()
+
+    duplicates = {name: count for name, count in rows.items() if count > 1}
+    split_ids = {name: ids for name, ids in results.items() if len(ids) > 1}
+    missing = [name for name in names if name not in rows]
+
+    print(f"{args.logins} Anmeldungen, {args.names} Namen, {args.threads} Threads in {duration:.2f} s")
+    print(f"Fehler: {len(errors)}  doppelte Spieler: {len(duplicates)}  "
+          f"Namen mit mehreren IDs: {len(split_ids)}  fehlende Namen: {len(missing)}")
+    for error in errors[:5]:
+        print(f"  {error}")
+
+    ok = not (errors or duplicates or split_ids or missing)
+    print("OK" if ok else "FEHLGESCHLAGEN")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# Prüft den Kachelserver (script/tile_server.py) gegen einen lokalen Ersatz-Anbieter
+#
+# Startet einen Ersatz-Anbieter, der für jede Kachel ein kleines PNG mit z/x/y erzeugt und die
+# Anfragen zählt, und den Kachelserver mit einem temporären Verzeichnis. Geprüft werden:
+#   - read-through: die erste Anfrage geht zum Anbieter, die zweite kommt aus der MBTiles-Datei
+#   - Cache-Control und ETag, If-None-Match liefert 304
+#   - seed lädt alle Kacheln der Zoomstufen, danach liefert der Offline-Server sie ohne Anbieter
+#   - offline gibt es für fehlende Kacheln 404
+# Zusätzlich werden die Antwortzeiten über den Anbieter und aus dem Speicher verglichen.
+#
+# Beispiel (aus dem Projektverzeichnis):
+#   python benchmark/tile_server_check.py --max-zoom 4
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "script"))
+
+import tile_server  # noqa: E402
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+
+
+# Ersatz-Anbieter: /<z>/<x>/<y>.png mit künstlicher Latenz
+def start_upstream(latency):
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests.append(self.path)
+            time.sleep(latency)
+            body = PNG_HEADER + self.path.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, requests
+
+
+def start_tile_server(store):
+    server = tile_server.make_server(store, "127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def get(url, headers=None):
+    request = urllib.request.Request(url, headers=headers or {})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, dict(response.headers), response.read(), time.perf_counter() - start
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), b"", time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kachelserver gegen lokalen Ersatz-Anbieter prüfen")
+    parser.add_argument("--max-zoom", type=int, default=4, help="höchste Zoomstufe für seed")
+    parser.add_argument("--latency", type=float, default=0.02, help="künstliche Latenz des Anbieters in Sekunden")
+    args = parser.parse_args()
+
+    failures = []
+
+    def check(condition, message):
+        print(f"{'OK  ' if condition else 'FEHL'} {message}")
+        if not condition:
+            failures.append(message)
+
+    upstream, upstream_requests = start_upstream(args.latency)
+    upstream_url = f"http://127.0.0.1:{upstream.server_address[1]}/{{z}}/{{x}}/{{y}}.png"
+    upstream_urls = {name: upstream_url for name in tile_server.TILESETS}
+
+    with tempfile.TemporaryDirectory() as tile_dir:
+        # Read-through
+        store = tile_server.TileStore(tile_dir, upstream_urls)
+        server, base = start_tile_server(store)
+        url = f"{base}/tiles/voyager_nolabels/3/5/2.png"
+        status, headers, body, first = get(url)
+        check(status == 200 and body == PNG_HEADER + b"/3/5/2.png", "erste Anfrage vom Anbieter")
+        check(len(upstream_requests) == 1, "genau eine Anfrage beim Anbieter")
+        status, headers, body, second = get(url)
+        check(status == 200 and len(upstream_requests) == 1, "zweite Anfrage aus der MBTiles-Datei")
+        check(headers.get("Content-Type") == "image/png", "Content-Type image/png")
+        check("max-age" in headers.get("Cache-Control", ""), f"Cache-Control: {headers.get('Cache-Control')}")
+        status, _, _, _ = get(url, {"If-None-Match": headers.get("ETag", "")})
+        check(status == 304, "If-None-Match liefert 304")
+        status, _, _, _ = get(f"{base}/tiles/voyager_nolabels/3/8/0.png")
+        check(status == 404, "Kachel außerhalb des Rasters liefert 404")
+        server.shutdown()
+
+        # Seed
+        before = len(upstream_requests)
+        start = time.perf_counter()
+        loaded, present, failed = store.seed("world_imagery", 0, args.max_zoom)
+        expected = sum(4 ** z for z in range(args.max_zoom + 1))
+        check(loaded == expected and failed == 0, f"seed: {loaded} von {expected} Kacheln in {time.perf_counter() - start:.1f} s")
+        loaded, present, _ = store.seed("world_imagery", 0, args.max_zoom)
+        check(loaded == 0 and present == expected, "zweiter seed lädt nichts nach")
+        check(len(upstream_requests) - before == expected, "jede Kachel genau einmal beim Anbieter")
+        store.close()
+
+        # Offline aus den MBTiles-Dateien
+        upstream.shutdown()
+        offline = tile_server.TileStore(tile_dir, upstream_urls, offline=True)
+        server, base = start_tile_server(offline)
+        times = []
+        for z in range(args.max_zoom + 1):
+            for x in range(1 << z):
+                status, _, body, seconds = get(f"{base}/tiles/world_imagery/{z}/{x}/{(x * 7) % (1 << z)}.png")
+                times.append(seconds)
+                if status != 200 or body != PNG_HEADER + f"/{z}/{x}/{(x * 7) % (1 << z)}.png".encode():
+                    failures.append(f"offline {z}/{x}")
+        check(not any(f.startswith("offline") for f in failures), f"offline {len(times)} Kacheln aus dem Speicher")
+        status, _, _, _ = get(f"{base}/tiles/shaded_relief/2/1/1.png")
+        check(status == 404, "offline: fehlende Kachel liefert 404")
+        server.shutdown()
+        offline.close()
+
+    print(f"Antwortzeit: über den Anbieter {first * 1000:.1f} ms, aus der MBTiles-Datei {second * 1000:.1f} ms, "
+          f"offline p50 {np.percentile(times, 50) * 1000:.2f} ms")
+    print("OK" if not failures else "FEHLGESCHLAGEN")
+    sys.exit(0 if not failures else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# Erzeugt aus dem Natural Earth Shapefile die kompakte Binärdatei countries.bin (Format: script/country_store.py).
+# Quelle: Natural Earth 1:110m Cultural Vectors. Admin o - Countries. Link: https://www.naturalearthdata.com/downloads/110m-cultural-vectors/.
+#
+# Aufruf aus dem Projektverzeichnis:
+#   python get_country_data/build_country_store.py             # float64, Stufen wie im GeoJSON-Cache
+#   python get_country_data/build_country_store.py --float32   # halbe Größe, ca. 1 m Genauigkeit
+#   python get_country_data/build_country_store.py --verify    # Abgleich mit countries_import.csv
+
+import argparse
+import csv
+import os
+import sys
+
+import geopandas as gpd
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "script"))
+
+import country_distance  # noqa: E402
+import geojson_cache  # noqa: E402
+from country_store import STORE_PATH, CountryStore, write_store  # noqa: E402
+
+SHAPEFILE = "get_country_data/world_borders/ne_110m_admin_0_countries.shp"
+CSV_FILE = "get_country_data/countries_import.csv"
+
+# Vereinfachungsstufen in Grad, passend zu den Zoomstufen des GeoJSON-Caches
+TOLERANCES = sorted({tolerance for tolerance, _ in geojson_cache.SIMPLIFY_LEVELS.values()})
+
+
+def _polygons(geometry):
+    return list(geometry.geoms) if geometry.geom_type == "MultiPolygon" else [geometry]
+
+
+# Koordinaten und Offsets einer Vereinfachungsstufe für alle Länder
+def _level_arrays(geometries, dtype):
+    coords, ring_offsets, polygon_offsets, country_offsets = [], [0], [0], [0]
+    for geometry in geometries:
+        for polygon in _polygons(geometry):
+            for ring in [polygon.exterior, *polygon.interiors]:
+                ring_coords = np.asarray(ring.coords, dtype=np.float64)[:, :2]
+                coords.append(ring_coords)
+                ring_offsets.append(ring_offsets[-1] + len(ring_coords))
+            polygon_offsets.append(len(ring_offsets) - 1)
+        country_offsets.append(len(polygon_offsets) - 1)
+
+    return {
+        "coords": np.concatenate(coords).astype(dtype),
+        "ring_offsets": np.array(ring_offsets, dtype=np.int64),
+        "polygon_offsets": np.array(polygon_offsets, dtype=np.int64),
+        "country_offsets": np.array(country_offsets, dtype=np.int64)
+    }
+
+
+def build(output, dtype):
+    # Natural Earth Shapefile einmal laden
+    gdf = gpd.read_file(SHAPEFILE)
+    names = list(gdf["NAME"])
+
+    # Schwerpunkt flächentreu (EPSG:6933) berechnet und zurück nach WGS84 transformiert
+    centroids = gdf.geometry.to_crs(6933).centroid.to_crs(4326)
+    arrays = {
+        "bbox": gdf.geometry.bounds[["minx", "miny", "maxx", "maxy"]].to_numpy(dtype=np.float64),
+        "centroid": np.column_stack([centroids.x, centroids.y]).astype(np.float64)
+    }
+
+    for level, tolerance in enumerate(TOLERANCES):
+        geometries = gdf.geometry if tolerance == 0 else gdf.geometry.simplify(tolerance, preserve_topology=True)
+        for key, array in _level_arrays(geometries, dtype).items():
+            arrays[f"level_{level}/{key}"] = array
+
+    write_store(output, names, arrays, tolerances=TOLERANCES)
+    print(f"{len(names)} Länder, {len(TOLERANCES)} Stufen, {os.path.getsize(output) / 1024:.0f} KiB -> {os.path.normpath(output)}")
+
+
+# Vergleicht die Originalstufe mit der CSV-Datei aus import_geometry.py
+def verify(path):
+    store = CountryStore(path)
+    # WKT-Text und Binärwerte können sich in der letzten Stelle unterscheiden
+    tolerance = 1e-5 if store.arrays["level_0/coords"].dtype == np.float32 else 1e-12
+
+    csv.field_size_limit(sys.maxsize)
+    with open(CSV_FILE, newline="", encoding="utf-8") as f:
+        rows = {row["NAME"]: row["wkt_geom"] for row in csv.DictReader(f, delimiter=";")}
+
+    errors = []
+    if set(rows) != set(store.names):
+        errors.append(f"Ländernamen unterscheiden sich: {sorted(set(rows) ^ set(store.names))}")
+
+    for name in sorted(set(rows) & set(store.names)):
+        expected = country_distance.parse_wkt(rows[name])
+        actual = store.polygons(name)
+        if [len(rings) for rings in expected] != [len(rings) for rings in actual]:
+            errors.append(f"{name}: Anzahl Polygone/Ringe weicht ab")
+            continue
+        for expected_rings, actual_rings in zip(expected, actual):
+            for expected_ring, actual_ring in zip(expected_rings, actual_rings):
+                if expected_ring.shape != actual_ring.shape or np.abs(expected_ring - actual_ring).max() > tolerance:
+                    errors.append(f"{name}: Koordinaten weichen ab")
+                    break
+
+        min_lon, min_lat, max_lon, max_lat = store.bbox(name)
+        coords = np.concatenate([ring for rings in actual for ring in rings])
+        if not (min_lon <= coords[:, 0].min() + tolerance and coords[:, 0].max() - tolerance <= max_lon
+                and min_lat <= coords[:, 1].min() + tolerance and coords[:, 1].max() - tolerance <= max_lat):
+            errors.append(f"{name}: Bounding Box passt nicht")
+
+    for error in errors:
+        print(error)
+    print(f"{len(store.names)} Länder geprüft, {len(errors)} Abweichungen")
+    return not errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Erzeugt get_country_data/countries.bin aus dem Natural Earth Shapefile")
+    parser.add_argument("--output", default=STORE_PATH)
+    parser.add_argument("--float32", action="store_true", help="Koordinaten als float32 speichern")
+    parser.add_argument("--verify", action="store_true", help="nur die vorhandene Datei gegen die CSV prüfen")
+    args = parser.parse_args()
+
+    if args.verify:
+        sys.exit(0 if verify(args.output) else 1)
+    build(args.output, np.float32 if args.float32 else np.float64)
+    sys.exit(0 if verify(args.output) else 1)
\ No newline at end of file
@@ -0,0 +1,232 @@
+# Erzeugt die Distanzraster für die Länderwertung (Format: script/distance_grid.py).
+# Grundlage sind die Ländergeometrien aus countries.bin bzw. countries_import.csv, die Distanz wird
+# wie in country_distance berechnet (nächster Randpunkt auf der Kugel, Distanz auf dem Ellipsoid).
+#
+# Aufruf aus dem Projektverzeichnis:
+#   python get_country_data/build_distance_grid.py                  # Raster mit 0,2° Auflösung (ca. 1,5 min, 13 MiB)
+#   python get_country_data/build_distance_grid.py --report 5000    # zusätzlich Genauigkeitsbericht
+#   python get_country_data/build_distance_grid.py --report 5000 --report-only --postgis
+#
+# Der Bericht vergleicht die Punkte aus dem Raster mit der genauen Wertung: standardmäßig mit
+# country_distance (bildet ST_Distance lokal nach), mit --postgis direkt mit ST_Distance in der
+# Datenbank (Verbindung aus database_connection.DB_CONFIG).
+
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "script"))
+
+import country_distance  # noqa: E402
+import country_index  # noqa: E402
+from country_store import write_store  # noqa: E402
+from distance_grid import CLIPPED, GRID_PATH, SCALE, DistanceGrid  # noqa: E402
+from geopy.distance import EARTH_RADIUS  # noqa: E402
+from scoring import LIMIT_KM, calculate_score, ellipsoid_km  # noqa: E402
+
+# Sicherheitszuschlag für Kugel gegenüber Ellipsoid beim Zuschneiden der Fenster
+LIMIT_MARGIN = 1.01
+BLOCK = 16
+
+
+def _unit_vectors(lat, lon):
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+# Längenbereich des Landes; über den Antimeridian reichende Länder (Fidschi) in 0..360°
+def lon_range(geometry):
+    lons = np.concatenate([starts[:, 0] for _, starts, _ in geometry.polygons])
+    shifted = lons % 360.0
+    if shifted.max() - shifted.min() < lons.max() - lons.min():
+        return shifted.min(), shifted.max()
+    return lons.min(), lons.max()
+
+
+# Rasterfenster (lat0, lon0, Zeilen, Spalten): Ausdehnung des Landes plus LIMIT_KM, ausgerichtet auf step
+def window(geometry, step):
+    _, min_lat, _, max_lat = geometry.bbox
+    min_lon, max_lon = lon_range(geometry)
+    limit_angle = LIMIT_KM * LIMIT_MARGIN / EARTH_RADIUS
+
+    lat0 = max(-90.0, math.floor((min_lat - math.degrees(limit_angle)) / step) * step)
+    lat1 = min(90.0, math.ceil((max_lat + math.degrees(limit_angle)) / step) * step)
+
+    # Abstand zu einem Meridian bei Längendifferenz d_lon und Breite phi: asin(cos(phi) * sin(d_lon))
+    ratio = math.sin(limit_angle) / math.cos(math.radians(max(abs(lat0), abs(lat1))))
+    lon_margin = 360.0 if ratio >= 1 else math.degrees(math.asin(ratio))
+    lon0 = math.floor((min_lon - lon_margin) / step) * step
+    lon1 = math.ceil((max_lon + lon_margin) / step) * step
+    if lon1 - lon0 >= 360.0:
+        lon0, lon1 = -180.0, 180.0
+
+    return lat0, lon0, int(round((lat1 - lat0) / step)) + 1, int(round((lon1 - lon0) / step)) + 1
+
+
+# Distanzen in km (np.inf jenseits von LIMIT_KM) für alle Rasterpunkte außerhalb des Landes
+def boundary_distances(geometry, lats, lons):
+    limit_angle = LIMIT_KM * LIMIT_MARGIN / EARTH_RADIUS
+    lat_grid, lon_grid = np.meshgrid(lats, lons, indexing="ij")
+    result = np.full(lat_grid.shape, np.inf)
+
+    for r in range(0, len(lats), BLOCK):
+        for c in range(0, len(lons), BLOCK):
+            block_lats = lat_grid[r:r + BLOCK, c:c + BLOCK].ravel()
+            block_lons = lon_grid[r:r + BLOCK, c:c + BLOCK].ravel()
+            points = _unit_vectors(block_lats, block_lons)
+
+            # Mittelpunkt und Radius des Blocks begrenzen, welche Kanten am nächsten sein können
+            center = points.mean(axis=0)
+            center /= np.linalg.norm(center)
+            radius = np.arccos(np.clip(points @ center, -1.0, 1.0)).max()
+            center_distances = geometry.edge_distances(center[None])[0][0]
+            nearest_center = center_distances.min()
+            if nearest_center - radius > limit_angle:
+                continue
+            edges = np.flatnonzero(center_distances - radius <= nearest_center + radius)
+
+            distances, nearest = geometry.edge_distances(points, edges)
+            best = np.argmin(distances, axis=1)
+            angles = distances[np.arange(len(points)), best]
+            nearest = nearest[np.arange(len(points)), best]
+
+            near = angles <= limit_angle
+            block = np.full(len(points), np.inf)
+            if near.any():
+                nearest_lats = np.degrees(np.arcsin(np.clip(nearest[near, 2], -1.0, 1.0)))
+                nearest_lons = np.degrees(np.arctan2(nearest[near, 1], nearest[near, 0]))
+                block[near] = ellipsoid_km(block_lats[near], block_lons[near], nearest_lats, nearest_lons)
+            result[r:r + BLOCK, c:c + BLOCK] = block.reshape(lat_grid[r:r + BLOCK, c:c + BLOCK].shape)
+
+    return result
+
+
+def build_grid(name, geometry, index, step):
+    lat0, lon0, rows, columns = window(geometry, step)
+    lats = lat0 + np.arange(rows) * step
+    lons = lon0 + np.arange(columns) * step
+    distances = boundary_distances(geometry, lats, lons)
+
+    # Rasterpunkte im Land (nur innerhalb der Bounding Box möglich) haben Distanz 0
+    min_lon, min_lat, max_lon, max_lat = geometry.bbox
+    lat_grid, lon_grid = np.meshgrid(lats, lons, indexing="ij")
+    wrapped = (lon_grid + 180.0) % 360.0 - 180.0
+    in_bbox = (lat_grid >= min_lat) & (lat_grid <= max_lat) & (wrapped >= min_lon) & (wrapped <= max_lon)
+    inside = np.zeros(lat_grid.shape, dtype=bool)
+    inside[in_bbox] = np.array(index.lookup_many(lat_grid[in_bbox], wrapped[in_bbox])) == name
+    distances[inside] = 0.0
+
+    grid = np.full(distances.shape, CLIPPED, dtype=np.uint16)
+    within = distances < LIMIT_KM
+    grid[within] = np.round(distances[within] / LIMIT_KM * SCALE).astype(np.uint16)
+    return (lat0, lon0), grid
+
+
+def build(output, step):
+    countries = country_distance.get_countries()
+    index = country_index.get_index()
+    names = list(countries)
+
+    start = time.perf_counter()
+    origins, arrays = [], {}
+    for i, name in enumerate(names):
+        origin, grid = build_grid(name, countries[name], index, step)
+        origins.append(origin)
+        arrays[f"grid/{i}"] = grid
+    arrays["origins"] = np.array(origins, dtype=np.float64)
+
+    write_store(output, names, arrays, step=step, limit_km=LIMIT_KM)
+    cells = sum(array.size for key, array in arrays.items() if key.startswith("grid/"))
+    print(f"{len(names)} Länder, {cells} Rasterpunkte, {os.path.getsize(output) / 1024 / 1024:.1f} MiB "
+          f"in {time.perf_counter() - start:.0f} s -> {os.path.normpath(output)}")
+
+
+# Zufällige Tipps in bis zu 1200 km Entfernung von zufälligen Randpunkten zufälliger Länder
+def sample_guesses(countries, n, seed):
+    rng = np.random.default_rng(seed)
+    names = list(countries)
+    guesses = []
+    for _ in range(n):
+        name = names[rng.integers(len(names))]
+        _, starts, _ = countries[name].polygons[rng.integers(len(countries[name].polygons))]
+        lon, lat = starts[rng.integers(len(starts))]
+        # Zielpunkt auf der Kugel für Richtung und Distanz
+        angle = rng.uniform(0, 1200) / EARTH_RADIUS
+        bearing = rng.uniform(0, 2 * math.pi)
+        lat1, lon1 = math.radians(lat), math.radians(lon)
+        lat2 = math.asin(math.sin(lat1) * math.cos(angle) + math.cos(lat1) * math.sin(angle) * math.cos(bearing))
+        lon2 = lon1 + math.atan2(math.sin(bearing) * math.sin(angle) * math.cos(lat1), math.cos(angle) - math.sin(lat1) * math.sin(lat2))
+        guesses.append((name, math.degrees(lat2), (math.degrees(lon2) + 180.0) % 360.0 - 180.0))
+    return guesses
+
+
+def postgis_distance(cur, name, lat, lon):
+    cur.execute(
+        "SELECT ST_Distance(geom::geography, ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography) FROM countries WHERE name_en = %s",
+        (lon, lat, name)
+    )
+    result = cur.fetchone()
+    return None if result is None or result[0] is None else result[0] / 1000
+
+
+def report(path, n, seed, postgis):
+    grid = DistanceGrid(path)
+    countries = country_distance.get_countries()
+    guesses = sample_guesses(countries, n, seed)
+
+    cur = None
+    if postgis:
+        import psycopg2
+        import database_connection as db
+        conn = psycopg2.connect(**db.DB_CONFIG)
+        cur = conn.cursor()
+
+    compared, from_grid, differing, errors = 0, 0, 0, []
+    grid_time, exact_time = 0.0, 0.0
+    for name, lat, lon in guesses:
+        start = time.perf_counter()
+        exact = postgis_distance(cur, name, lat, lon) if cur else country_distance.distance_to_country_km((lat, lon), name)
+        exact_time += time.perf_counter() - start
+        if exact is None:
+            continue
+        compared += 1
+
+        start = time.perf_counter()
+        approx = grid.distance_km(lat, lon, name)
+        grid_time += time.perf_counter() - start
+        if approx is None:
+            continue
+        from_grid += 1
+        errors.append(abs(approx - exact))
+        if calculate_score(approx) != calculate_score(exact):
+            differing += 1
+
+    if cur is not None:
+        cur.connection.close()
+
+    errors = np.array(errors) if errors else np.zeros(1)
+    print(f"Vergleich mit {'PostGIS ST_Distance' if postgis else 'country_distance'}: {compared} Tipps, "
+          f"{from_grid} aus dem Raster, Rest genau berechnet (außerhalb oder über {LIMIT_KM:.0f} km)")
+    print(f"Abweichende Punkte: {differing} ({differing / max(from_grid, 1):.2%} der Rasterwerte)")
+    print(f"Distanzfehler: Mittel {errors.mean():.2f} km, p99 {np.percentile(errors, 99):.2f} km, max {errors.max():.2f} km")
+    print(f"Laufzeit je Tipp: Raster {grid_time / max(compared, 1) * 1e6:.1f} µs, genau {exact_time / max(compared, 1) * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Erzeugt get_country_data/distance_grid.bin")
+    parser.add_argument("--output", default=GRID_PATH)
+    parser.add_argument("--step", type=float, default=0.2, help="Rasterweite in Grad")
+    parser.add_argument("--report", type=int, default=0, help="Anzahl zufälliger Tipps für den Genauigkeitsbericht")
+    parser.add_argument("--report-only", action="store_true", help="vorhandene Datei nur prüfen")
+    parser.add_argument("--postgis", action="store_true", help="mit ST_Distance aus der Datenbank vergleichen")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if not args.report_only:
+        build(args.output, args.step)
+    if args.report:
+        report(args.output, args.report, args.seed, args.postgis)
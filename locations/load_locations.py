@@ -0,0 +1,170 @@
+# Lädt die Orte aus den CSV-Dateien in locations/ in die Tabellen cities, countries, berge und gebaeude
+#
+# Alle Tabellen werden in einer Transaktion geladen:
+#   1. COPY der CSV-Datei in eine temporäre Staging-Tabelle mit den Spaltentypen der Zieltabelle
+#   2. Upsert auf den natürlichen Schlüssel (Name bzw. englischer Name, jeweils mit Schwierigkeit);
+#      unveränderte Zeilen werden nicht angefasst, mit --prune werden Orte gelöscht, die nicht
+#      mehr in der Datei stehen
+#   3. Der Index (difficulty, id) wird vor dem Einfügen entfernt und danach neu aufgebaut
+# Länder erhalten ihre Geometrie aus get_country_data/countries_import.csv; Länder ohne Geometrie
+# werden übersprungen (wie bisher DELETE FROM countries WHERE geom IS NULL). Ein zweiter Lauf mit
+# denselben Dateien ändert nichts.
+#
+# Beispiel (aus dem Projektverzeichnis):
+#   python locations/load_locations.py --dbname cityguesser
+#   python locations/load_locations.py --tables countries --prune
+
+import argparse
+import csv
+import os
+import re
+import sys
+import time
+
+import psycopg2
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "script"))
+
+from database_connection import DB_CONFIG  # noqa: E402
+
+LOCATIONS_DIR = os.path.join(ROOT, "locations")
+GEOMETRY_CSV = os.path.join(ROOT, "get_country_data", "countries_import.csv")
+
+# Tabelle -> natürlicher Schlüssel
+TABLES = {
+    "cities": ("name", "difficulty"),
+    "countries": ("name_en", "difficulty"),
+    "berge": ("name", "difficulty"),
+    "gebaeude": ("name", "difficulty")
+}
+
+COLUMN_PATTERN = re.compile(r"^[a-z_]+$")
+
+
+def read_columns(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        columns = next(csv.reader(f))
+    for column in columns:
+        if not COLUMN_PATTERN.match(column):
+            raise ValueError(f"Ungültiger Spaltenname in {path}: {column!r}")
+    return columns
+
+
+# Lädt eine Tabelle; liefert die Zähler für den Bericht
+def load_table(cur, table, path, prune=False):
+    key = TABLES[table]
+    columns = read_columns(path)
+    missing = [column for column in key if column not in columns]
+    if missing:
+        raise ValueError(f"{path}: Schlüsselspalten fehlen: {missing}")
+    column_list = ", ".join(columns)
+    staging = f"staging_{table}"
+
+    cur.execute(f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS SELECT {column_list} FROM {table} WITH NO DATA")
+    with open(path, encoding="utf-8") as f:
+        cur.copy_expert(f"COPY {staging} ({column_list}) FROM STDIN WITH (FORMAT csv, HEADER true)", f)
+    cur.execute(f"SELECT count(*) FROM {staging}")
+    rows = cur.fetchone()[0]
+
+    key_list = ", ".join(key)
+    cur.execute(f"SELECT {key_list} FROM {staging} GROUP BY {key_list} HAVING count(*) > 1")
+    duplicates = cur.fetchall()
+    if duplicates:
+        raise ValueError(f"{path}: doppelte Schlüssel {duplicates}")
+
+    # Länder nur mit Geometrie
+    select_columns = ", ".join(f"s.{column}" for column in columns)
+    source = f"{staging} AS s"
+    insert_columns = columns
+    skipped = []
+    if table == "countries":
+        cur.execute("CREATE TEMP TABLE staging_geometry (name_en TEXT, wkt_geometry TEXT) ON COMMIT DROP")
+        with open(GEOMETRY_CSV, encoding="utf-8") as f:
+            cur.copy_expert("COPY staging_geometry (name_en, wkt_geometry) FROM STDIN WITH (FORMAT csv, DELIMITER ';', HEADER true)", f)
+        cur.execute(f"SELECT s.name_en FROM {staging} AS s LEFT JOIN staging_geometry AS g USING (name_en) WHERE g.name_en IS NULL")
+        skipped = [name for (name,) in cur.fetchall()]
+        select_columns += ", ST_Multi(ST_GeomFromText(g.wkt_geometry, 4326))"
+        source += " JOIN staging_geometry AS g USING (name_en)"
+        insert_columns = columns + ["geom"]
+
+    cur.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {table}_natural_key ON {table} ({key_list})")
+    cur.execute(f"DROP INDEX IF EXISTS {table}_difficulty_id_idx")
+
+    updates = [column for column in insert_columns if column not in key]
+    cur.execute(f"""
+        INSERT INTO {table} ({", ".join(insert_columns)})
+        SELECT {select_columns} FROM {source}
+        ON CONFLICT ({key_list}) DO UPDATE SET {", ".join(f"{column} = EXCLUDED.{column}" for column in updates)}
+        WHERE ({", ".join(f"{table}.{column}" for column in updates)})
+            IS DISTINCT FROM ({", ".join(f"EXCLUDED.{column}" for column in updates)})
+        RETURNING xmax = 0
+    """)
+    results = [inserted for (inserted,) in cur.fetchall()]
+    inserted = sum(results)
+    updated = len(results) - inserted
+
+    deleted = 0
+    if prune:
+        cur.execute(f"""
+            DELETE FROM {table} AS t
+            WHERE NOT EXISTS (SELECT 1 FROM {source} WHERE {" AND ".join(f"s.{column} = t.{column}" for column in key)})
+        """)
+        deleted = cur.rowcount
+
+    cur.execute(f"CREATE INDEX {table}_difficulty_id_idx ON {table} (difficulty, id)")
+    cur.execute(f"ANALYZE {table}")
+
+    return {
+        "rows": rows,
+        "inserted": inserted,
+        "updated": updated,
+        "unchanged": rows - len(skipped) - inserted - updated,
+        "deleted": deleted,
+        "skipped": skipped
+    }
+
+
+def load(conn, tables, directory=LOCATIONS_DIR, prune=False):
+    report = {}
+    with conn.cursor() as cur:
+        for table in tables:
+            start = time.perf_counter()
+            report[table] = load_table(cur, table, os.path.join(directory, f"{table}.csv"), prune)
+            report[table]["seconds"] = time.perf_counter() - start
+    conn.commit()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lädt die Orte aus locations/*.csv in die Datenbank")
+    parser.add_argument("--dbname", default=os.environ.get("PGDATABASE", DB_CONFIG["dbname"]))
+    parser.add_argument("--user", default=os.environ.get("PGUSER", DB_CONFIG["user"]))
+    parser.add_argument("--password", default=os.environ.get("PGPASSWORD", DB_CONFIG["password"]))
+    parser.add_argument("--host", default=os.environ.get("PGHOST", DB_CONFIG["host"]))
+    parser.add_argument("--port", default=os.environ.get("PGPORT", DB_CONFIG["port"]))
+    parser.add_argument("--tables", nargs="+", choices=TABLES, default=list(TABLES))
+    parser.add_argument("--directory", default=LOCATIONS_DIR, help="Verzeichnis mit <tabelle>.csv")
+    parser.add_argument("--prune", action="store_true", help="Orte löschen, die nicht in der Datei stehen")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    conn = psycopg2.connect(dbname=args.dbname, user=args.user, password=args.password, host=args.host, port=args.port)
+    try:
+        report = load(conn, args.tables, args.directory, args.prune)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    for table, stats in report.items():
+        print(f"{table:10s} {stats['rows']:7d} Zeilen  neu {stats['inserted']:6d}  geändert {stats['updated']:6d}  "
+              f"unverändert {stats['unchanged']:6d}  gelöscht {stats['deleted']:6d}  {stats['seconds']:.2f} s")
+        if stats["skipped"]:
+            print(f"{'':10s} ohne Geometrie übersprungen: {', '.join(stats['skipped'])}")
+    print(f"Gesamt {sum(stats['rows'] for stats in report.values())} Zeilen in {time.perf_counter() - start:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+# Asynchroner Datenbankzugriff (asyncpg) für voneinander unabhängige Abfragen
+#
+# AsyncDatabase bietet die Lesefunktionen aus database_connection als Koroutinen auf einem
+# eigenen, kleinen asyncpg-Pool (ASYNC_POOL_CONFIG) an und nutzt dieselben Caches (GeoJSON,
+# Historie, Bestenliste). Pool und Ereignisschleife laufen in einem Hintergrund-Thread pro
+# Prozess; Streamlit-Code ruft die synchronen Funktionen am Ende der Datei auf, die mehrere
+# Abfragen per asyncio.gather gleichzeitig ausführen:
+#   reveal_country    Distanz zum Land und GeoJSON für die Auflösung
+#   player_overview   Historie und Statistiken des Spielers
+#   leaderboard_view  Top-N und eigener Rang
+# Ist asyncpg nicht installiert oder der Pool nicht erreichbar, laufen dieselben Abfragen
+# nacheinander über database_connection. Ein fehlgeschlagener Verbindungsaufbau wird gemerkt
+# und erst nach RETRY_AFTER Sekunden erneut versucht. Messung: benchmark/async_fanout.py
+
+import asyncio
+import atexit
+import logging
+import re
+import threading
+import time
+
+import streamlit as st
+
+import database_connection as db
+import geojson_cache
+import instrumentation
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+logger = logging.getLogger(__name__)
+
+# Gleichzeitige Abfragen über asyncpg; False erzwingt den sequentiellen Weg
+USE_ASYNC = True
+# Sekunden für den Aufbau einer Verbindung des Pools
+CONNECT_TIMEOUT = 2.0
+# Sekunden nach einem fehlgeschlagenen Verbindungsaufbau, bis er erneut versucht wird
+RETRY_AFTER = 60.0
+
+
+# Wandelt die psycopg2-Platzhalter %s in die nummerierten Platzhalter von asyncpg um
+def numbered(query):
+    counter = iter(range(1, query.count("%s") + 1))
+    return re.sub(r"%s", lambda _: f"${next(counter)}", query)
+
+
+class AsyncDatabase:
+    def __init__(self, db_config, pool_config, geojson, history, leaderboard):
+        self.geojson = geojson
+        self.history = history
+        self.leaderboard = leaderboard
+        self.timeout = pool_config["timeout"]
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="async-db", daemon=True)
+        self._thread.start()
+        try:
+            self._pool = self.run(self._create_pool(db_config, pool_config))
+        except Exception:
+            self._stop_loop()
+            raise
+
+    # create_pool liefert ein Awaitable, keine Koroutine, und muss daher hier erwartet werden
+    async def _create_pool(self, db_config, pool_config):
+        return await asyncpg.create_pool(
+            database=db_config["dbname"],
+            user=db_config["user"],
+            password=db_config["password"],
+            host=db_config["host"],
+            port=int(db_config["port"]),
+            min_size=pool_config["min_size"],
+            max_size=pool_config["max_size"],
+            timeout=CONNECT_TIMEOUT
+        )
+
+    # Führt eine Koroutine auf der Hintergrundschleife aus und wartet auf das Ergebnis
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def _stop_loop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        if not self._thread.is_alive():
+            self._loop.close()
+
+    def close(self):
+        if not self._thread.is_alive():
+            return
+        self.run(self._pool.close())
+        self._stop_loop()
+
+    def stats(self):
+        size, idle = self._pool.get_size(), self._pool.get_idle_size()
+        return {"size": size, "idle": idle, "in_use": size - idle, "max_size": self._pool.get_max_size()}
+
+    async def _fetch(self, query, params, fetch_one=False):
+        async with self._pool.acquire(timeout=self.timeout) as conn:
+            if fetch_one:
+                row = await conn.fetchrow(numbered(query), *params)
+                return tuple(row) if row is not None else None
+            return [tuple(row) for row in await conn.fetch(numbered(query), *params)]
+
+    # Wie db.calculate_dist_to_country; Fehler werden an den Aufrufer weitergereicht. Die lokale
+    # Berechnung läuft in einem Thread, damit sie die gemeinsame Schleife nicht blockiert.
+    async def calculate_dist_to_country(self, guess, country, country_en=None, geojson=None):
+        distance_km = await asyncio.to_thread(db.local_dist_to_country, guess, country, country_en, geojson)
+        if distance_km is not None:
+            return distance_km
+
+        guess_lat, guess_lon = guess
+        result = await self._fetch(db.DISTANCE_QUERY, (guess_lon, guess_lat, country), fetch_one=True)
+        if result and result[0] is not None:
+            return result[0] / 1000
+        return None
+
+    # Wie db.get_country_geojson
+    async def get_country_geojson(self, country_name, zoom=None):
+        level = geojson_cache.level_for_zoom(zoom)
+        cached = self.geojson.get(country_name, level)
+        if cached:
+            return cached
+
+        tolerance, decimals = geojson_cache.SIMPLIFY_LEVELS[level]
+        result = await self._fetch(db.GEOJSON_QUERY + " WHERE name = %s", (tolerance, decimals, country_name), fetch_one=True)
+        if result and result[1]:
+            self.geojson.put(country_name, level, result[1])
+            return result[1]
+        return None
+
+    # Wie db.get_last_games
+    async def get_last_games(self, player_id):
+        found, rows = self.history.get(player_id)
+        if not found:
+            generation = self.history.generation(player_id)
+            rows = await self._fetch(db.HISTORY_QUERY, (player_id,))
+            self.history.put(player_id, rows, generation)
+        return rows, not rows
+
+    # Bestenlisten-Abfragen über den TTL-Cache des LeaderboardService
+    async def _leaderboard(self, request):
+        key, query, params, fetch_one = request
+        found, value = self.leaderboard.lookup(key)
+        if found:
+            return value
+        # Das Neuberechnen der Sicht ist selten und bleibt beim synchronen Pool
+        await asyncio.to_thread(self.leaderboard.refresh_if_stale)
+        generation = self.leaderboard.generation(key)
+        value = await self._fetch(query, params, fetch_one)
+        self.leaderboard.remember(key, value, generation)
+        return value
+
+    async def get_leaderboard(self, game_mode, difficulty, n=10):
+        return await self._leaderboard(self.leaderboard.top_request(game_mode, difficulty, n))
+
+    async def get_player_rank(self, game_mode, difficulty, player_id):
+        return await self._leaderboard(self.leaderboard.rank_request(game_mode, difficulty, player_id))
+
+    async def get_player_stats(self, player_id):
+        return await self._leaderboard(self.leaderboard.stats_request(player_id))
+
+    # Mehrere Koroutinen gleichzeitig; Fehler werden als Ergebnis geliefert statt abzubrechen
+    async def gather(self, *coros):
+        return await asyncio.gather(*coros, return_exceptions=True)
+
+
+# Platzhalter im Cache für einen fehlgeschlagenen Verbindungsaufbau
+class Unavailable:
+    def __init__(self):
+        self.failed_at = time.monotonic()
+
+
+# Ein Pool mit Ereignisschleife pro Prozess; Unavailable, wenn keine Verbindung möglich ist
+@st.cache_resource
+def _get_async_database():
+    try:
+        database = AsyncDatabase(db.DB_CONFIG, db.ASYNC_POOL_CONFIG, db.get_geojson_cache(), db.get_history_cache(), db.get_leaderboard_service())
+    except Exception:
+        logger.exception("asyncpg-Pool nicht verfügbar, neuer Versuch in %.0f s", RETRY_AFTER)
+        return Unavailable()
+    atexit.register(database.close)
+    return database
+
+# None, wenn asyncpg fehlt oder der letzte Verbindungsaufbau vor weniger als RETRY_AFTER fehlschlug
+def get_async_database():
+    if asyncpg is None or not USE_ASYNC:
+        return None
+    database = _get_async_database()
+    if isinstance(database, Unavailable) and time.monotonic() - database.failed_at >= RETRY_AFTER:
+        _get_async_database.clear()
+        database = _get_async_database()
+    return None if isinstance(database, Unavailable) else database
+
+# Momentwerte aus database_connection ergänzt um den asyncpg-Pool (falls verbunden)
+def get_metrics_gauges():
+    gauges = db.get_metrics_gauges()
+    database = get_async_database()
+    if database is not None:
+        for key, value in database.stats().items():
+            gauges[f"async_pool_{key}"] = value
+    return gauges
+
+
+# Distanz zum Land und GeoJSON in der Zoomstufe der Auflösung
+@instrumentation.timed("db.reveal_country")
+def reveal_country(guess, country, country_en=None, geojson=None, zoom=None):
+    database = get_async_database()
+    if database is None:
+        return db.calculate_dist_to_country(guess, country, country_en, geojson), db.get_country_geojson(country, zoom)
+
+    # GeoJSON zuerst: die Abfrage ist unterwegs, während die Distanz in einem Thread berechnet wird
+    country_geojson, distance_km = database.run(database.gather(
+        database.get_country_geojson(country, zoom),
+        database.calculate_dist_to_country(guess, country, country_en, geojson)
+    ))
+    if isinstance(distance_km, Exception):
+        st.error(f"SQL Fehler: {distance_km}")
+        distance_km = None
+    if isinstance(country_geojson, Exception):
+        st.error(f"SQL Fehler (GeoJSON): {country_geojson}")
+        country_geojson = None
+    return distance_km, country_geojson
+
+# Historie (Zeilen, leer?) und Statistiken des Spielers; Datenbankfehler werden ausgelöst
+@instrumentation.timed("db.player_overview")
+def player_overview(player_id):
+    database = get_async_database()
+    if database is None:
+        return db.get_last_games(player_id), db.get_player_stats(player_id)
+
+    history, stats = database.run(database.gather(database.get_last_games(player_id), database.get_player_stats(player_id)))
+    for result in (history, stats):
+        if isinstance(result, Exception):
+            raise result
+    return history, stats
+
+# Top-N und Rang des Spielers (None ohne Spieler-ID); Datenbankfehler werden ausgelöst
+@instrumentation.timed("db.leaderboard_view")
+def leaderboard_view(game_mode, difficulty, player_id=None, n=10):
+    database = get_async_database()
+    if database is None:
+        rank = db.get_player_rank(game_mode, difficulty, player_id) if player_id else None
+        return db.get_leaderboard(game_mode, difficulty, n), rank
+
+    coros = [database.get_leaderboard(game_mode, difficulty, n)]
+    if player_id:
+        coros.append(database.get_player_rank(game_mode, difficulty, player_id))
+    results = database.run(database.gather(*coros))
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+    return results[0], results[1] if player_id else None
@@ -0,0 +1,169 @@
+# Tages- und Stunden-Challenges: ein gemeinsamer Satz Orte pro Spielmodus, Schwierigkeit und Zeitraum
+#
+# Die Orte einer Challenge werden einmal mit einem aus (Tabelle, Schwierigkeit, Zeitraum)
+# abgeleiteten Seed gezogen und samt Zieldaten (Koordinaten, Infos, bei Ländern alle
+# GeoJSON-Stufen) in challenges gespeichert. Der erste Prozess legt die Challenge an, alle
+# anderen lesen sie aus der Tabelle; danach wird sie allen Sessions aus dem Prozess-Cache
+# ausgegeben, ohne Ortsabfrage. Zeiträume laufen in UTC.
+# Ergebnisse stehen in challenge_results (gewertet wird das erste Spiel eines Spielers),
+# Rangliste und Rang sind Indexzugriffe auf (challenge_id, score DESC).
+
+import copy
+import hashlib
+import threading
+from datetime import datetime, timezone
+
+from psycopg2.extras import Json
+
+from ttl_cache import TTLCache
+
+# Zeitraum -> Format des Schlüssels (UTC)
+PERIODS = {
+    "daily": "%Y-%m-%d",
+    "hourly": "%Y-%m-%dT%H"
+}
+
+CHALLENGE_ROUNDS = 5
+
+SELECT_QUERY = """
+    SELECT id, locations
+    FROM challenges
+    WHERE table_name = %s AND difficulty = %s AND period = %s AND period_key = %s
+"""
+
+INSERT_QUERY = """
+    INSERT INTO challenges (table_name, difficulty, period, period_key, seed, rounds, locations)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON CONFLICT (table_name, difficulty, period, period_key) DO NOTHING
+    RETURNING id
+"""
+
+RESULT_QUERY = """
+    INSERT INTO challenge_results (challenge_id, player, score, rounds)
+    VALUES (%s, %s, %s, %s)
+    ON CONFLICT (challenge_id, player) DO NOTHING
+    RETURNING player
+"""
+
+TOP_QUERY = """
+    SELECT rank() OVER (ORDER BY r.score DESC), p.name, r.score
+    FROM challenge_results r
+    JOIN players p ON p.id = r.player
+    WHERE r.challenge_id = %s
+    ORDER BY r.score DESC, r.played_at
+    LIMIT %s
+"""
+
+RANK_QUERY = """
+    SELECT (SELECT count(*) FROM challenge_results o WHERE o.challenge_id = r.challenge_id AND o.score > r.score) + 1,
+           r.score,
+           (SELECT count(*) FROM challenge_results o WHERE o.challenge_id = r.challenge_id)
+    FROM challenge_results r
+    WHERE r.challenge_id = %s AND r.player = %s
+"""
+
+
+# Schlüssel des laufenden Zeitraums, z. B. "2024-05-01" oder "2024-05-01T13"
+def period_key(period, now=None):
+    now = now or datetime.now(timezone.utc)
+    return now.strftime(PERIODS[period])
+
+
+# Reproduzierbarer Seed (passt in BIGINT) für die Ortsauswahl einer Challenge
+def challenge_seed(table_name, difficulty, period, key):
+    digest = hashlib.sha256(f"{table_name}|{difficulty}|{period}|{key}".encode()).digest()
+    return int.from_bytes(digest[:8], "big") >> 1
+
+
+# JSON kennt nur Text-Schlüssel; die GeoJSON-Stufen sind Zoomstufen (int)
+def _restore(locations):
+    for location in locations:
+        if "geojson" in location:
+            location["geojson"] = {int(level): geojson for level, geojson in location["geojson"].items()}
+    return locations
+
+
+class ChallengeService:
+    # load_locations(table_name, count, difficulty, seed) -> Liste der Orte wie fetch_game_data
+    def __init__(self, connection, load_locations, rounds=CHALLENGE_ROUNDS, ranking_ttl=10.0):
+        self.connection = connection
+        self.load_locations = load_locations
+        self.rounds = rounds
+        self._challenges = TTLCache(max_entries=256)
+        self._rankings = TTLCache(ranking_ttl)
+        self._lock = threading.Lock()
+
+    # Liest die Challenge aus der Tabelle oder legt sie an; (ID, Orte) bzw. (None, []) ohne Orte
+    def _load_or_create(self, table_name, difficulty, period, key):
+        with self.connection() as conn, conn.cursor() as cur:
+            cur.execute(SELECT_QUERY, (table_name, difficulty, period, key))
+            row = cur.fetchone()
+        if row:
+            return row[0], _restore(row[1])
+
+        seed = challenge_seed(table_name, difficulty, period, key)
+        locations = self.load_locations(table_name, self.rounds, difficulty, seed)
+        if not locations:
+            return None, []
+
+        with self.connection() as conn, conn.cursor() as cur:
+            cur.execute(INSERT_QUERY, (table_name, difficulty, period, key, seed, len(locations), Json(locations)))
+            row = cur.fetchone()
+            if row:
+                return row[0], locations
+            # Ein anderer Prozess hat die Challenge gleichzeitig angelegt
+            cur.execute(SELECT_QUERY, (table_name, difficulty, period, key))
+            row = cur.fetchone()
+        return row[0], _restore(row[1])
+
+    # (ID, Orte) der laufenden Challenge; jede Session erhält eine eigene Kopie der Orte
+    def challenge(self, table_name, difficulty, period, now=None):
+        key = (table_name, difficulty, period, period_key(period, now))
+        found, value = self._challenges.get(key)
+        if not found:
+            # Nur ein Thread pro Prozess lädt oder erzeugt eine Challenge
+            with self._lock:
+                found, value = self._challenges.get(key)
+                if not found:
+                    value = self._load_or_create(*key)
+                    if value[0] is not None:
+                        self._challenges.put(key, value)
+        challenge_id, locations = value
+        return challenge_id, copy.deepcopy(locations)
+
+    # Speichert das Ergebnis; False, wenn der Spieler die Challenge schon gespielt hat
+    def submit(self, challenge_id, player_id, score, rounds):
+        with self.connection() as conn, conn.cursor() as cur:
+            cur.execute(RESULT_QUERY, (challenge_id, player_id, score, rounds))
+            counted = cur.fetchone() is not None
+        if counted:
+            self._rankings.clear()
+        return counted
+
+    def _cached(self, key, query, params, fetch_one=False):
+        found, value = self._rankings.get(key)
+        if found:
+            return value
+
+        with self.connection() as conn, conn.cursor() as cur:
+            cur.execute(query, params)
+            value = cur.fetchone() if fetch_one else cur.fetchall()
+        self._rankings.put(key, value)
+        return value
+
+    # Top-N der Challenge als Liste (Rang, Name, Punkte)
+    def top(self, challenge_id, n=10):
+        return self._cached(("top", challenge_id, n), TOP_QUERY, (challenge_id, n))
+
+    # Rang eines Spielers als (Rang, Punkte, Teilnehmer) oder None
+    def player_rank(self, challenge_id, player_id):
+        return self._cached(("rank", challenge_id, player_id), RANK_QUERY, (challenge_id, player_id), fetch_one=True)
+
+    def stats(self):
+        stats = self._challenges.stats()
+        return {
+            "challenges": stats["entries"],
+            "hits": stats["hits"],
+            "misses": stats["misses"],
+            "ranking_entries": self._rankings.stats()["entries"]
+        }
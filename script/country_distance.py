@@ -0,0 +1,209 @@
+# Lokale Distanzberechnung zwischen Tipp und Land (ohne PostGIS-Abfrage)
+#
+# Die Ländergeometrien werden einmal pro Prozess aus get_country_data/countries.bin
+# (build_country_store.py) geladen, ersatzweise aus countries_import.csv (WKT, import_geometry.py). Die Berechnung bildet ST_Distance auf
+# geography nach: Kanten sind Großkreisbögen, der nächste Punkt wird auf der Kugel gesucht
+# und die Distanz zu diesem Punkt auf dem WGS84-Ellipsoid gemessen.
+# Toleranz gegenüber PostGIS: Abweichung < 0,5 % der Distanz, liegt der Tipp im Land, ist die Distanz 0.
+
+import csv
+import json
+import math
+import os
+import re
+import sys
+from functools import lru_cache
+
+import numpy as np
+from geopy.distance import geodesic
+
+import country_store
+
+CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "get_country_data", "countries_import.csv")
+
+# Großkreisbögen können über die Bounding Box der Eckpunkte hinausragen
+BBOX_LAT_MARGIN = 2.0
+
+
+# Zerlegt POLYGON / MULTIPOLYGON WKT in Polygone aus Ringen (Arrays mit lon, lat)
+def parse_wkt(wkt):
+    wkt = wkt.strip()
+    body = wkt[wkt.index("("):].strip()
+
+    if wkt.upper().startswith("MULTIPOLYGON"):
+        polygon_texts = re.split(r"\)\)\s*,\s*\(\(", body[1:-1])
+    elif wkt.upper().startswith("POLYGON"):
+        polygon_texts = [body]
+    else:
+        raise ValueError(f"Nicht unterstützter Geometrietyp: {wkt[:20]}")
+
+    polygons = []
+    for text in polygon_texts:
+        rings = []
+        for ring_text in re.findall(r"\(*([^()]+)\)*", text):
+            if not ring_text.strip(" ,"):
+                continue
+            coords = [tuple(map(float, pair.split())) for pair in ring_text.split(",") if pair.strip()]
+            rings.append(np.array(coords, dtype=np.float64))
+        polygons.append(rings)
+    return polygons
+
+
+def _to_unit_vectors(lat, lon):
+    lat = np.radians(lat)
+    lon = np.radians(lon)
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def _angle_between(u, v):
+    return np.arctan2(np.linalg.norm(np.cross(u, v), axis=-1), np.sum(u * v, axis=-1))
+
+
+# Geometrie eines Landes mit vorberechneten Kanten für Punkt-im-Polygon und Distanz
+class CountryGeometry:
+    def __init__(self, name, polygons):
+        self.name = name
+        self.polygons = []
+
+        edge_starts, edge_ends = [], []
+        for rings in polygons:
+            coords = np.concatenate(rings)
+            bbox = (
+                coords[:, 0].min(), coords[:, 1].min() - BBOX_LAT_MARGIN,
+                coords[:, 0].max(), coords[:, 1].max() + BBOX_LAT_MARGIN
+            )
+            starts = np.concatenate([ring[:-1] for ring in rings])
+            ends = np.concatenate([ring[1:] for ring in rings])
+            self.polygons.append((bbox, starts, ends))
+            edge_starts.append(starts)
+            edge_ends.append(ends)
+
+        starts = np.concatenate(edge_starts)
+        ends = np.concatenate(edge_ends)
+        self._a = _to_unit_vectors(starts[:, 1], starts[:, 0])
+        self._b = _to_unit_vectors(ends[:, 1], ends[:, 0])
+        normals = np.cross(self._a, self._b)
+        norms = np.linalg.norm(normals, axis=1)
+        self._degenerate = norms < 1e-15
+        self._normals = normals / np.where(self._degenerate, 1.0, norms)[:, None]
+
+        all_coords = np.concatenate([ring for rings in polygons for ring in rings])
+        self.bbox = (all_coords[:, 0].min(), all_coords[:, 1].min(), all_coords[:, 0].max(), all_coords[:, 1].max())
+
+    # Punkt-im-Polygon mit einem Strahl Richtung Norden; Kanten werden als Großkreisbögen behandelt
+    def contains(self, lat, lon):
+        for (min_lon, min_lat, max_lon, max_lat), starts, ends in self.polygons:
+            if not (min_lon <= lon <= max_lon and min_lat <= lat <= max_lat):
+                continue
+
+            lon1, lat1 = starts[:, 0], starts[:, 1]
+            lon2, lat2 = ends[:, 0], ends[:, 1]
+            # Kanten entlang eines Pols (Antarktis) schneiden den Strahl nicht
+            crossing = ((lon1 > lon) != (lon2 > lon)) & ((np.abs(lat1) < 90) | (np.abs(lat2) < 90))
+            if not crossing.any():
+                continue
+
+            lon1, lat1, lon2, lat2 = lon1[crossing], lat1[crossing], lon2[crossing], lat2[crossing]
+            tan1 = np.tan(np.radians(np.clip(lat1, -89.999999, 89.999999)))
+            tan2 = np.tan(np.radians(np.clip(lat2, -89.999999, 89.999999)))
+            d_lon = np.radians(lon2 - lon1)
+            edge_lat = np.degrees(np.arctan(
+                (tan1 * np.sin(np.radians(lon2 - lon)) + tan2 * np.sin(np.radians(lon - lon1))) / np.sin(d_lon)
+            ))
+            if np.count_nonzero(edge_lat > lat) % 2 == 1:
+                return True
+        return False
+
+    # Winkelabstände (rad) von Punkten (P, 3) zu den Kanten (Indexarray, None = alle) als (P, E)
+    # und die jeweils nächsten Randpunkte als (P, E, 3)
+    def edge_distances(self, points, edges=None):
+        a, b, normals, degenerate = self._a, self._b, self._normals, self._degenerate
+        if edges is not None:
+            a, b, normals, degenerate = a[edges], b[edges], normals[edges], degenerate[edges]
+        p = points[:, None, :]
+
+        # Projektion der Punkte auf den Großkreis jeder Kante
+        sin_dist = np.sum(normals * p, axis=-1)
+        projected = p - sin_dist[..., None] * normals
+        projected /= np.maximum(np.linalg.norm(projected, axis=-1), 1e-15)[..., None]
+
+        on_arc = (
+            ~degenerate
+            & (np.sum(np.cross(a, projected) * normals, axis=-1) >= 0)
+            & (np.sum(np.cross(projected, b) * normals, axis=-1) >= 0)
+        )
+
+        dist_a = _angle_between(a, p)
+        dist_b = _angle_between(b, p)
+        dist_arc = np.where(on_arc, np.arcsin(np.clip(np.abs(sin_dist), 0.0, 1.0)), np.inf)
+
+        dist_end = np.minimum(dist_a, dist_b)
+        nearest_end = np.where((dist_a <= dist_b)[..., None], a, b)
+        nearest = np.where((dist_arc <= dist_end)[..., None], projected, nearest_end)
+        return np.minimum(dist_arc, dist_end), nearest
+
+    # Nächster Punkt auf dem Rand (Kugel), als (lat, lon)
+    def nearest_boundary_point(self, lat, lon):
+        distances, nearest = self.edge_distances(_to_unit_vectors(lat, lon)[None])
+        nearest = nearest[0, np.argmin(distances[0])]
+
+        return math.degrees(math.asin(max(-1.0, min(1.0, nearest[2])))), math.degrees(math.atan2(nearest[1], nearest[0]))
+
+    # Kürzeste Distanz in km zwischen Punkt und Land (0, wenn der Punkt im Land liegt)
+    def distance_km(self, lat, lon):
+        if self.contains(lat, lon):
+            return 0.0
+        return geodesic((lat, lon), self.nearest_boundary_point(lat, lon)).kilometers
+
+
+# Lädt alle Länder aus der CSV-Datei, Schlüssel ist der englische Name (Spalte NAME)
+def load_countries(path=CSV_PATH):
+    csv.field_size_limit(sys.maxsize)
+    countries = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f, delimiter=";"):
+            countries[row["NAME"]] = CountryGeometry(row["NAME"], parse_wkt(row["wkt_geom"]))
+    return countries
+
+
+# Geometrie aus GeoJSON (Polygon oder MultiPolygon), z. B. aus den vorgeladenen Spieldaten
+@lru_cache(maxsize=256)
+def geometry_from_geojson(name, geojson):
+    geometry = json.loads(geojson)
+    match geometry["type"]:
+        case "Polygon": polygons = [geometry["coordinates"]]
+        case "MultiPolygon": polygons = geometry["coordinates"]
+        case other: raise ValueError(f"Nicht unterstützter Geometrietyp: {other}")
+    return CountryGeometry(name, [[np.array(ring, dtype=np.float64) for ring in rings] for rings in polygons])
+
+
+# Lädt alle Länder aus der Binärdatei (Originalstufe), Schlüssel ist der englische Name
+def load_countries_from_store(path=country_store.STORE_PATH):
+    store = country_store.CountryStore(path)
+    return {name: CountryGeometry(name, store.polygons(name)) for name in store.names}
+
+
+# Einmal pro Prozess geladene Geometrien, bevorzugt aus der Binärdatei
+@lru_cache(maxsize=1)
+def get_countries():
+    if os.path.exists(country_store.STORE_PATH):
+        return load_countries_from_store()
+    return load_countries()
+
+
+# Distanz in km zwischen Tipp und Land oder None, wenn das Land lokal nicht vorliegt
+def distance_to_country_km(guess, country_en):
+    country = get_countries().get(country_en)
+    if country is None:
+        return None
+    lat, lon = guess
+    lon = (lon + 180.0) % 360.0 - 180.0
+    return country.distance_km(lat, lon)
+
+
+# Distanz in km zwischen Tipp und einer als GeoJSON übergebenen Landesgeometrie
+def distance_to_geojson_km(guess, name, geojson):
+    lat, lon = guess
+    lon = (lon + 180.0) % 360.0 - 180.0
+    return geometry_from_geojson(name, geojson).distance_km(lat, lon)
\ No newline at end of file
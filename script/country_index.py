@@ -0,0 +1,212 @@
+# Räumlicher Index für die Frage "In welchem Land liegt dieser Punkt?" (ohne PostGIS)
+#
+# Gitter aus 1°-Zellen über die Ländergeometrien aus country_distance (Natural Earth 1:110m).
+# Zellen, die keine Kante berühren, liegen vollständig in einem Land oder im Meer und werden
+# mit einem Listenzugriff beantwortet. In Randzellen werden nur die Polygone geprüft, die die
+# Zelle überdecken, und dabei nur deren Kanten in der Längengrad-Spalte des Punktes. Der
+# Punkt-im-Polygon-Test entspricht CountryGeometry.contains (Strahl nach Norden, Kanten als
+# Großkreisbögen), MultiPolygone werden Polygon für Polygon geprüft.
+# Antimeridian: Längen werden auf [-180, 180) normiert, Kanten über 180° werden dort geteilt
+# (Natural Earth teilt Fidschi und Russland bereits), Kanten entlang eines Pols zählen nie.
+
+import math
+from functools import lru_cache
+
+import numpy as np
+
+import country_distance
+
+ROWS = 180
+COLUMNS = 360
+
+OCEAN = -1
+BOUNDARY = -2
+
+# Großkreisbögen werden alle ARC_STEP Grad Länge abgetastet, um ihre Breitenausdehnung zu bestimmen
+ARC_STEP = 0.5
+ARC_MARGIN = 0.01
+
+TAN_LIMIT = 89.999999
+
+
+def _row(lat):
+    return min(int(lat + 90.0), ROWS - 1)
+
+
+def _column(lon):
+    return min(int(lon + 180.0), COLUMNS - 1)
+
+
+def _normalize_lon(lon):
+    return (lon + 180.0) % 360.0 - 180.0
+
+
+def _tan(lat):
+    return math.tan(math.radians(max(-TAN_LIMIT, min(TAN_LIMIT, lat))))
+
+
+# Breite des Großkreisbogens durch (lon1, lat1) und (lon2, lat2) bei den Längen lon
+def _arc_lat(lon1, lat1, lon2, lat2, lon):
+    tan1, tan2 = _tan(lat1), _tan(lat2)
+    return np.degrees(np.arctan(
+        (tan1 * np.sin(np.radians(lon2 - lon)) + tan2 * np.sin(np.radians(lon - lon1))) / math.sin(math.radians(lon2 - lon1))
+    ))
+
+
+# Teilt Kanten am Antimeridian und verwirft Kanten entlang eines Pols
+def _split_edges(starts, ends):
+    edges = []
+    for (lon1, lat1), (lon2, lat2) in zip(starts.tolist(), ends.tolist()):
+        lon1 = max(-180.0, min(180.0, lon1))
+        lon2 = max(-180.0, min(180.0, lon2))
+        if abs(lat1) >= 90.0 and abs(lat2) >= 90.0:
+            continue
+        if abs(lon2 - lon1) <= 180.0:
+            edges.append((lon1, lat1, lon2, lat2))
+            continue
+
+        # Kante über 180°: Schnittbreite auf dem Großkreis bestimmen und in zwei Kanten teilen
+        side = 180.0 if lon1 > 0 else -180.0
+        unwrapped = lon2 + 360.0 if lon1 > 0 else lon2 - 360.0
+        lat = float(_arc_lat(lon1, lat1, unwrapped, lat2, side))
+        edges.append((lon1, lat1, side, lat))
+        edges.append((-side, lat, lon2, lat2))
+    return edges
+
+
+class CountryIndex:
+    # countries: Name -> CountryGeometry (wie country_distance.get_countries())
+    def __init__(self, countries):
+        self.names = list(countries)
+        self._polygon_country = []
+        polygon_lat_ranges = []
+        column_edges = {}
+        touched = np.zeros((ROWS, COLUMNS), dtype=bool)
+
+        for country, name in enumerate(self.names):
+            for _, starts, ends in countries[name].polygons:
+                polygon = len(self._polygon_country)
+                self._polygon_country.append(country)
+                min_lat, max_lat = 90.0, -90.0
+
+                for lon1, lat1, lon2, lat2 in _split_edges(starts, ends):
+                    # Breitenausdehnung des Bogens (kann über die Eckpunkte hinausragen)
+                    if lon1 == lon2:
+                        low, high = min(lat1, lat2), max(lat1, lat2)
+                    else:
+                        samples = np.linspace(lon1, lon2, int(abs(lon2 - lon1) / ARC_STEP) + 2)
+                        lats = _arc_lat(lon1, lat1, lon2, lat2, samples)
+                        low, high = float(lats.min()), float(lats.max())
+                    low, high = max(-90.0, low - ARC_MARGIN), min(90.0, high + ARC_MARGIN)
+                    min_lat, max_lat = min(min_lat, low), max(max_lat, high)
+
+                    first, last = _column(min(lon1, lon2)), _column(max(lon1, lon2))
+                    touched[_row(low):_row(high) + 1, first:last + 1] = True
+
+                    # Senkrechte Kanten schneiden den Strahl nach Norden nie
+                    if lon1 != lon2:
+                        edge = (lon1, lon2, _tan(lat1), _tan(lat2), math.sin(math.radians(lon2 - lon1)))
+                        for column in range(first, last + 1):
+                            column_edges.setdefault((polygon, column), []).append(edge)
+
+                polygon_lat_ranges.append((min_lat, max_lat))
+
+        self._column_edges = {key: tuple(edges) for key, edges in column_edges.items()}
+
+        # Polygone mit Kanten je Spalte; nur sie können einen Punkt dieser Spalte enthalten
+        column_polygons = [[] for _ in range(COLUMNS)]
+        for polygon, column in self._column_edges:
+            column_polygons[column].append(polygon)
+
+        owner = np.full((ROWS, COLUMNS), OCEAN, dtype=np.int32)
+        self._candidates = {}
+        for column in range(COLUMNS):
+            run_owner = None
+            for row in range(ROWS):
+                lat_low, lat_high = row - 90.0, row - 89.0
+                candidates = tuple(
+                    polygon for polygon in column_polygons[column]
+                    if polygon_lat_ranges[polygon][0] <= lat_high and polygon_lat_ranges[polygon][1] >= lat_low
+                )
+                if touched[row, column]:
+                    owner[row, column] = BOUNDARY
+                    self._candidates[row * COLUMNS + column] = candidates
+                    run_owner = None
+                    continue
+
+                # Innerhalb eines Laufs unberührter Zellen einer Spalte ändert sich die Zugehörigkeit nicht
+                if run_owner is None:
+                    run_owner = self._find(candidates, column, column - 179.5, _tan(row - 89.5))
+                    run_owner = OCEAN if run_owner is None else run_owner
+                owner[row, column] = run_owner
+
+        self._owner = owner
+        self._owner_list = owner.ravel().tolist()
+
+    def _inside(self, polygon, column, lon, tan_lat):
+        crossings = 0
+        for lon1, lon2, tan1, tan2, sin_d in self._column_edges.get((polygon, column), ()):
+            if (lon1 > lon) != (lon2 > lon):
+                edge_tan = (tan1 * math.sin(math.radians(lon2 - lon)) + tan2 * math.sin(math.radians(lon - lon1))) / sin_d
+                if edge_tan > tan_lat:
+                    crossings += 1
+        return crossings % 2 == 1
+
+    # Index des Landes oder None
+    def _find(self, candidates, column, lon, tan_lat):
+        for polygon in candidates:
+            if self._inside(polygon, column, lon, tan_lat):
+                return self._polygon_country[polygon]
+        return None
+
+    def _lookup_index(self, lat, lon):
+        if not -90.0 <= lat <= 90.0:
+            return None
+        lon = _normalize_lon(lon)
+        row, column = _row(lat), _column(lon)
+        owner = self._owner_list[row * COLUMNS + column]
+        if owner >= 0:
+            return owner
+        if owner == OCEAN:
+            return None
+        return self._find(self._candidates[row * COLUMNS + column], column, lon, _tan(lat))
+
+    # Name des Landes (englisch, wie in countries.name_en), in dem der Punkt liegt, sonst None
+    def lookup(self, lat, lon):
+        country = self._lookup_index(lat, lon)
+        return None if country is None else self.names[country]
+
+    # Wie lookup für viele Punkte; Zellen im Inneren werden vektorisiert beantwortet
+    def lookup_many(self, lats, lons):
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = (np.asarray(lons, dtype=np.float64) + 180.0) % 360.0 - 180.0
+        valid = (lats >= -90.0) & (lats <= 90.0)
+        rows = np.minimum((np.where(valid, lats, 0.0) + 90.0).astype(np.intp), ROWS - 1)
+        columns = np.minimum((lons + 180.0).astype(np.intp), COLUMNS - 1)
+        owners = np.where(valid, self._owner[rows, columns], OCEAN)
+
+        result = [None if owner < 0 else self.names[owner] for owner in owners.tolist()]
+        for i in np.flatnonzero(owners == BOUNDARY).tolist():
+            country = self._find(self._candidates[rows[i] * COLUMNS + columns[i]], int(columns[i]), float(lons[i]), _tan(float(lats[i])))
+            result[i] = None if country is None else self.names[country]
+        return result
+
+    def stats(self):
+        return {
+            "countries": len(self.names),
+            "polygons": len(self._polygon_country),
+            "interior_cells": int(np.count_nonzero(self._owner >= 0)),
+            "ocean_cells": int(np.count_nonzero(self._owner == OCEAN)),
+            "boundary_cells": int(np.count_nonzero(self._owner == BOUNDARY))
+        }
+
+
+# Einmal pro Prozess aufgebauter Index über alle Länder
+@lru_cache(maxsize=1)
+def get_index():
+    return CountryIndex(country_distance.get_countries())
+
+
+# Englischer Ländername am Punkt (lat, lon) oder None (Meer)
+def country_at(lat, lon):
+    return get_index().lookup(lat, lon)
@@ -0,0 +1,113 @@
+# Kompaktes Binärformat für die Ländergeometrien (erzeugt von get_country_data/build_country_store.py)
+#
+# Aufbau der Datei:
+#   8 Byte Kennung b"CGSTORE1", 4 Byte Headerlänge (uint32, little endian), JSON-Header,
+#   danach die Arrays jeweils an 64 Byte ausgerichtet.
+# Pro Vereinfachungsstufe gibt es vier Arrays:
+#   coords           (N, 2) lon/lat als float64 oder float32
+#   ring_offsets     Start jedes Rings in coords (+ Endwert)
+#   polygon_offsets  erster Ring jedes Polygons (+ Endwert)
+#   country_offsets  erstes Polygon jedes Landes (+ Endwert)
+# Dazu für alle Länder bbox (min_lon, min_lat, max_lon, max_lat) und centroid (lon, lat).
+# Beim Laden wird die Datei per mmap eingeblendet, die Arrays sind Sichten ohne Kopie.
+# write_store/map_store werden auch für andere Dateien im selben Format genutzt (distance_grid.py).
+
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b"CGSTORE1"
+VERSION = 1
+ALIGNMENT = 64
+
+STORE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "get_country_data", "countries.bin")
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+# Schreibt die Arrays (Name -> ndarray) mit Header in die Datei; metadata landet zusätzlich im Header
+def write_store(path, names, arrays, **metadata):
+    layout = {}
+    offset = 0
+    for key, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[key] = array
+        layout[key] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+        offset = _aligned(offset + array.nbytes)
+
+    header = json.dumps(dict(metadata, version=VERSION, names=names, arrays=layout)).encode("utf-8")
+    data_start = _aligned(len(MAGIC) + 4 + len(header))
+
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        for key, array in arrays.items():
+            f.seek(data_start + layout[key]["offset"])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+
+
+# Blendet die Datei ein; liefert (mmap, Header, Name -> ndarray-Sicht)
+def map_store(path):
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if mapped[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"Keine Länderdatei: {path}")
+    (header_len,) = struct.unpack_from("<I", mapped, len(MAGIC))
+    header = json.loads(mapped[len(MAGIC) + 4:len(MAGIC) + 4 + header_len])
+    if header["version"] != VERSION:
+        raise ValueError(f"Nicht unterstützte Version {header['version']}")
+
+    data_start = _aligned(len(MAGIC) + 4 + header_len)
+    arrays = {}
+    for key, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"]))
+        arrays[key] = np.frombuffer(mapped, dtype, count, data_start + spec["offset"]).reshape(spec["shape"])
+    return mapped, header, arrays
+
+
+class CountryStore:
+    def __init__(self, path=STORE_PATH):
+        self._mmap, header, self.arrays = map_store(path)
+        self.names = header["names"]
+        self.tolerances = header["tolerances"]
+        self._index = {name: i for i, name in enumerate(self.names)}
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def __len__(self):
+        return len(self.names)
+
+    def bbox(self, name):
+        return tuple(self.arrays["bbox"][self._index[name]])
+
+    def centroid(self, name):
+        return tuple(self.arrays["centroid"][self._index[name]])
+
+    # Polygone eines Landes als Liste von Ringlisten (Sichten auf coords); level ist der Index in tolerances
+    def polygons(self, name, level=0):
+        coords = self.arrays[f"level_{level}/coords"]
+        ring_offsets = self.arrays[f"level_{level}/ring_offsets"]
+        polygon_offsets = self.arrays[f"level_{level}/polygon_offsets"]
+        country_offsets = self.arrays[f"level_{level}/country_offsets"]
+
+        i = self._index[name]
+        polygons = []
+        for p in range(country_offsets[i], country_offsets[i + 1]):
+            rings = [coords[ring_offsets[r]:ring_offsets[r + 1]] for r in range(polygon_offsets[p], polygon_offsets[p + 1])]
+            polygons.append(rings)
+        return polygons
+
+    # Stufe mit der größten Toleranz, die tolerance nicht überschreitet (0 = Original)
+    def level_for_tolerance(self, tolerance):
+        candidates = [i for i, t in enumerate(self.tolerances) if t <= tolerance]
+        return max(candidates, key=lambda i: self.tolerances[i]) if candidates else 0
\ No newline at end of file
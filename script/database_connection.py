@@ -1,111 +1,345 @@
 # Sämtliche Datenbanklogik
 
+import atexit
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
 import psycopg2
+import psycopg2.extensions
 import streamlit as st
 
+import country_distance
+import distance_grid
+import geojson_cache
+import instrumentation
+from challenges import ChallengeService
+from geojson_cache import GeoJsonCache
+from guess_writer import GuessWriter
+from leaderboard import LeaderboardService
+from location_sampler import LocationSampler
+from score_writer import ScoreWriter
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
 # Konfiguration der DB-Verbindung
 DB_CONFIG = {
-    "dbname": "", 
+    "dbname": "",
     "user": "postgres",
     "password": "",
     "host": "localhost",
     "port": "5432"
 }
 
-# Herstellung der DB-Verbindung
-def get_db_connection():
-    try:
-        return psycopg2.connect(**DB_CONFIG)
-    except Exception as e:
-        st.error(f"Datenbank-Verbindungsfehler: {e}")
+# Konfiguration des Verbindungspools (gilt für alle Streamlit-Sessions des Prozesses)
+POOL_CONFIG = {
+    "min_size": 1,              # Verbindungen, die beim Start geöffnet werden
+    "max_size": 10,             # Obergrenze gleichzeitig ausgeliehener Verbindungen
+    "timeout": 5.0,             # Sekunden, die maximal auf eine freie Verbindung gewartet wird
+    "health_check_after": 30.0  # Sekunden Leerlauf, nach denen eine Verbindung vor Ausgabe geprüft wird
+}
 
-# Wählt eine bestimmte Anzahl an Orten abhängig vom Spielmodus  
-def fetch_random_locations(table_name, count, difficulty):
-    conn = get_db_connection()
-    if not conn:
-        return []
+# Eigener, kleinerer asyncpg-Pool für die gleichzeitigen Abfragen aus async_database; der Prozess
+# öffnet höchstens POOL_CONFIG["max_size"] + ASYNC_POOL_CONFIG["max_size"] Verbindungen
+ASYNC_POOL_CONFIG = {
+    "min_size": 1,
+    "max_size": 3,
+    "timeout": 5.0
+}
 
-    cur = conn.cursor()
-    
-    # Bei Bergen und Gebäuden wird die Höhe mit abgefragt
-    if table_name in ["berge", "gebaeude"]:
-        query = f"""
-        SELECT name, latitude, longitude, hoehe, info, difficulty, clue
-        FROM {table_name}
-        WHERE difficulty = %s
-        ORDER BY RANDOM()
-        LIMIT %s;
-        """
-
-        data = []
+
+class PoolTimeout(Exception):
+    pass
+
+
+# Prozessweiter Pool mit begrenzter Größe, Health-Checks und Metriken
+class ConnectionPool:
+    def __init__(self, min_size, max_size, timeout, health_check_after, **db_config):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        self.db_config = db_config
+
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats = {
+            "checkouts": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "exhausted": 0,
+            "timeouts": 0,
+            "created": 0,
+            "discarded": 0,
+            "health_check_failures": 0,
+            "in_use": 0
+        }
+
+        for _ in range(min_size):
+            self._idle.put((self._connect(), time.monotonic()))
+
+    def _connect(self):
+        conn = psycopg2.connect(**self.db_config)
+        with self._lock:
+            self._stats["created"] += 1
+        return conn
+
+    def _discard(self, conn):
+        with self._lock:
+            self._stats["discarded"] += 1
         try:
-            cur.execute(query, (difficulty, count))
-            results = cur.fetchall()
-            for res in results:
-                data.append({
-                    "name": res[0],
-                    "lat": float(res[1]),
-                    "lon": float(res[2]),
-                    "hoehe": res[3],
-                    "info": res[4],
-                    "difficulty": res[5],
-                    "clue": res[6]
-                })
-        except Exception as e:
-            st.error(f"SQL Fehler: {e}")
-        finally:
             conn.close()
-    
-    # Bei Städten und Ländern wird keine Höhe abgefragt
-    else:
-        query = f"""
-            SELECT name, latitude, longitude, info, difficulty, clue
-            FROM {table_name} 
-            WHERE difficulty = %s
-            ORDER BY RANDOM()
-            LIMIT %s;
-        """
-
-        data = []
+        except Exception:
+            pass
+
+    # Prüft eine länger ungenutzte Verbindung mit einer leichten Abfrage
+    def _is_healthy(self, conn, idle_since):
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.health_check_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            with self._lock:
+                self._stats["health_check_failures"] += 1
+            return False
+
+    def _checkout(self):
+        if self._closed:
+            raise PoolTimeout("Verbindungspool ist geschlossen")
+
+        start = time.monotonic()
+        if not self._slots.acquire(blocking=False):
+            # Alle Verbindungen sind ausgeliehen, es muss gewartet werden
+            with self._lock:
+                self._stats["exhausted"] += 1
+            if not self._slots.acquire(timeout=self.timeout):
+                with self._lock:
+                    self._stats["timeouts"] += 1
+                raise PoolTimeout(f"Keine freie DB-Verbindung nach {self.timeout} s")
+        waited = time.monotonic() - start
+
+        try:
+            conn = None
+            while conn is None:
+                try:
+                    candidate, idle_since = self._idle.get_nowait()
+                except queue.Empty:
+                    conn = self._connect()
+                    break
+                if self._is_healthy(candidate, idle_since):
+                    conn = candidate
+                else:
+                    self._discard(candidate)
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["wait_time_total"] += waited
+            self._stats["wait_time_max"] = max(self._stats["wait_time_max"], waited)
+            self._stats["in_use"] += 1
+        return conn
+
+    def _checkin(self, conn):
+        try:
+            if self._closed or conn.closed:
+                self._discard(conn)
+            elif conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                # Offene oder fehlerhafte Transaktion nicht an den nächsten Nutzer weitergeben
+                try:
+                    conn.rollback()
+                    self._idle.put((conn, time.monotonic()))
+                except Exception:
+                    self._discard(conn)
+            else:
+                self._idle.put((conn, time.monotonic()))
+        finally:
+            with self._lock:
+                self._stats["in_use"] -= 1
+            self._slots.release()
+
+    # Leiht eine Verbindung aus und gibt sie garantiert zurück (Commit bei Erfolg, Rollback bei Fehler)
+    @contextmanager
+    def connection(self):
+        conn = self._checkout()
         try:
-            cur.execute(query, (difficulty, count))
-            results = cur.fetchall()
-            for res in results:
-                data.append({
-                    "name": res[0],
-                    "lat": float(res[1]),
-                    "lon": float(res[2]),
-                    "info": res[3],
-                    "difficulty": res[4],
-                    "clue": res[5]
-                })
-        except Exception as e:
-            st.error(f"SQL Fehler: {e}")
+            yield conn
+            if not conn.closed:
+                conn.commit()
+        except Exception:
+            if not conn.closed:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+            raise
         finally:
+            self._checkin(conn)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["idle"] = self._idle.qsize()
+        stats["max_size"] = self.max_size
+        stats["wait_time_avg"] = stats["wait_time_total"] / stats["checkouts"] if stats["checkouts"] else 0.0
+        return stats
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
             conn.close()
 
+
+# Ein Pool pro Prozess, gemeinsam genutzt von allen Streamlit-Sessions
+@st.cache_resource
+def get_pool():
+    return ConnectionPool(**POOL_CONFIG, **DB_CONFIG)
+
+# Herstellung der DB-Verbindung über den Pool
+@contextmanager
+def get_db_connection():
+    with get_pool().connection() as conn:
+        yield conn
+
+# Kennzahlen des Verbindungspools
+def get_pool_stats():
+    return get_pool().stats()
+
+# Anzahl paralleler Hintergrund-Abfragen für das Vorladen des nächsten Spiels
+PREFETCH_WORKERS = 2
+
+# Abgefragte Spalten je Ortstabelle (Schlüssel im Ergebnis, Spalte in der Datenbank)
+LOCATION_COLUMNS = {
+    # Bei Bergen und Gebäuden wird die Höhe mit abgefragt
+    "berge": {"name": "name", "lat": "latitude", "lon": "longitude", "hoehe": "hoehe", "info": "info", "difficulty": "difficulty", "clue": "clue"},
+    "gebaeude": {"name": "name", "lat": "latitude", "lon": "longitude", "hoehe": "hoehe", "info": "info", "difficulty": "difficulty", "clue": "clue"},
+    # Bei Ländern wird zusätzlich der englische Name für die lokale Geometrie abgefragt
+    "countries": {"name": "name", "lat": "latitude", "lon": "longitude", "info": "info", "difficulty": "difficulty", "clue": "clue", "name_en": "name_en"},
+    # Bei Städten wird keine Höhe abgefragt
+    "cities": {"name": "name", "lat": "latitude", "lon": "longitude", "info": "info", "difficulty": "difficulty", "clue": "clue"}
+}
+
+# Ein Sampler pro Prozess, die ID-Listen werden von allen Sessions geteilt
+@st.cache_resource
+def get_sampler():
+    return LocationSampler()
+
+# Hintergrund-Threads für das Vorladen des nächsten Spiels
+@st.cache_resource
+def get_prefetch_executor():
+    return ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="game-prefetch")
+
+# Zieht die Orte und fragt sie mit einer Abfrage ab; mit preload zusätzlich alle GeoJSON-Stufen der Länder
+@instrumentation.timed("db.load_locations")
+def _load_locations(table_name, count, difficulty, seed=None, preload=False):
+    columns = dict(LOCATION_COLUMNS[table_name])
+    if preload and table_name == "countries":
+        for level, (tolerance, decimals) in geojson_cache.SIMPLIFY_LEVELS.items():
+            columns[f"geojson_{level}"] = f"ST_AsGeoJSON(ST_SimplifyPreserveTopology(geom, {tolerance}), {decimals})"
+    sampler = get_sampler()
+
+    data = []
+    with get_db_connection() as conn, conn.cursor() as cur:
+        ids = sampler.sample_ids(cur, table_name, difficulty, count, seed)
+        for res in sampler.fetch_rows(cur, table_name, list(columns.values()), ids):
+            row = dict(zip(columns, res))
+            row["lat"] = float(row["lat"])
+            row["lon"] = float(row["lon"])
+            data.append(row)
+
+    if preload and table_name == "countries":
+        cache = get_geojson_cache()
+        for row in data:
+            row["geojson"] = {level: row.pop(f"geojson_{level}") for level in geojson_cache.SIMPLIFY_LEVELS}
+            for level, geojson in row["geojson"].items():
+                if geojson:
+                    cache.put(row["name"], level, geojson)
+
     return data
 
-# Berechnung der Distanz zwischen Tipp und Land in PostgreSQL
-def calculate_dist_to_country(guess, country):
-    conn = get_db_connection()
-    if not conn: return None
-    
+# Wählt eine bestimmte Anzahl an Orten abhängig vom Spielmodus (mit seed reproduzierbar)
+@instrumentation.timed("db.fetch_random_locations")
+def fetch_random_locations(table_name, count, difficulty, seed=None):
+    try:
+        return _load_locations(table_name, count, difficulty, seed)
+    except Exception as e:
+        st.error(f"SQL Fehler: {e}")
+        return []
+
+# Lädt alle Daten eines Spiels auf einmal (Orte und bei Ländern die Geometrien aller Runden)
+@instrumentation.timed("db.fetch_game_data")
+def fetch_game_data(table_name, count, difficulty, seed=None):
+    try:
+        return _load_locations(table_name, count, difficulty, seed, preload=True)
+    except Exception as e:
+        st.error(f"SQL Fehler: {e}")
+        return []
+
+# Startet das Vorladen eines Spiels im Hintergrund, liefert ein Future mit den Spieldaten
+def prefetch_game_data(table_name, count, difficulty):
+    return get_prefetch_executor().submit(_load_locations, table_name, count, difficulty, None, True)
+
+# Berechnung der Distanz zwischen Tipp und Land, lokal (CSV-Geometrie oder vorgeladenes GeoJSON) oder in PostgreSQL
+# Distanzraster (get_country_data/distance_grid.bin) verwenden, falls erzeugt; jenseits von 1000 km wird genau gerechnet
+USE_DISTANCE_GRID = True
+
+# Distanz in km aus Raster, CSV-Geometrie oder vorgeladenem GeoJSON, None wenn lokal nicht möglich
+def local_dist_to_country(guess, country, country_en=None, geojson=None):
+    distance_km = None
+    if country_en and USE_DISTANCE_GRID:
+        try:
+            distance_km = distance_grid.distance_to_country_km(guess, country_en)
+        except Exception:
+            pass
+    if distance_km is None and country_en:
+        try:
+            distance_km = country_distance.distance_to_country_km(guess, country_en)
+        except Exception:
+            pass
+    if distance_km is None and geojson:
+        try:
+            distance_km = country_distance.distance_to_geojson_km(guess, country, geojson)
+        except Exception:
+            pass
+    return distance_km
+
+DISTANCE_QUERY = """
+    SELECT ST_Distance(
+        geom::geography,
+        ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography
+    ) AS distance_meters
+    FROM countries
+    WHERE name = %s
+"""
+
+@instrumentation.timed("db.calculate_dist_to_country")
+def calculate_dist_to_country(guess, country, country_en=None, geojson=None):
+    distance_km = local_dist_to_country(guess, country, country_en, geojson)
+    if distance_km is not None:
+        return distance_km
+
+    # Lokale Geometrie nicht verfügbar, Berechnung über PostGIS
     guess_lat, guess_lon = guess
 
-    cur = conn.cursor()
     try:
-        query = """
-            SELECT ST_Distance(
-                geom::geography, 
-                ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography
-            ) AS distance_meters 
-            FROM countries 
-            WHERE name = %s
-        """
-        cur.execute(query, (guess_lon, guess_lat, country))
-
-        result = cur.fetchone()
+        with get_db_connection() as conn, conn.cursor() as cur:
+            cur.execute(DISTANCE_QUERY, (guess_lon, guess_lat, country))
+            result = cur.fetchone()
 
         if result and result[0] is not None:
             distance_m = result[0]
@@ -113,81 +347,269 @@ def calculate_dist_to_country(guess, country):
             return distance_km
         else:
             return None
-        
+
     except Exception as e:
         st.error(f"SQL Fehler: {e}")
         return None
-    finally:
-        cur.close()
-        conn.close()
-
-# Abfrage der Länder Geometrie als Geojson
-def get_country_geojson(country_name):
-    conn = get_db_connection()
-    if not conn: return None
-    
-    cur = conn.cursor()
+
+# Größe des GeoJSON-Caches in Bytes (alle Länder in allen Stufen belegen nur wenige MB)
+GEOJSON_CACHE_BYTES = 32 * 1024 * 1024
+
+GEOJSON_QUERY = """
+    SELECT name, ST_AsGeoJSON(ST_SimplifyPreserveTopology(geom, %s), %s)
+    FROM countries
+"""
+
+# Ein GeoJSON-Cache pro Prozess, gemeinsam genutzt von allen Streamlit-Sessions
+@st.cache_resource
+def get_geojson_cache():
+    return GeoJsonCache(GEOJSON_CACHE_BYTES)
+
+# Abfrage der Länder Geometrie als Geojson (vereinfacht passend zur Zoomstufe, aus dem Cache)
+@instrumentation.timed("db.get_country_geojson")
+def get_country_geojson(country_name, zoom=None):
+    cache = get_geojson_cache()
+    level = geojson_cache.level_for_zoom(zoom)
+    cached = cache.get(country_name, level)
+    if cached:
+        return cached
+
+    tolerance, decimals = geojson_cache.SIMPLIFY_LEVELS[level]
     try:
-        query = "SELECT ST_AsGeoJSON(geom) FROM countries WHERE name = %s"
-        cur.execute(query, (country_name,))
-        
-        result = cur.fetchone()
-        
-        if result and result[0]:
-            return result[0]
+        with get_db_connection() as conn, conn.cursor() as cur:
+            cur.execute(GEOJSON_QUERY + " WHERE name = %s", (tolerance, decimals, country_name))
+            result = cur.fetchone()
+
+        if result and result[1]:
+            cache.put(country_name, level, result[1])
+            return result[1]
         return None
 
     except Exception as e:
         st.error(f"SQL Fehler (GeoJSON): {e}")
         return None
-    finally:
-        cur.close()
-        conn.close()
 
-# Speichern des Scores
+# Lädt beim App-Start alle Länder in allen Vereinfachungsstufen in den Cache (einmal pro Prozess).
+# Fehler werden ausgelöst, damit st.cache_resource kein fehlgeschlagenes Warm-up speichert.
+@st.cache_resource
+@instrumentation.timed("db.warm_up_geojson_cache")
+def _warm_up_geojson_cache():
+    cache = get_geojson_cache()
+    loaded = 0
+    with get_db_connection() as conn, conn.cursor() as cur:
+        for level, (tolerance, decimals) in geojson_cache.SIMPLIFY_LEVELS.items():
+            cur.execute(GEOJSON_QUERY + " WHERE geom IS NOT NULL", (tolerance, decimals))
+            for name, geojson in cur.fetchall():
+                cache.put(name, level, geojson)
+                loaded += 1
+    if not loaded:
+        raise RuntimeError("Keine Länder-Geometrien gefunden")
+    return loaded
+
+# Anzahl der vorgeladenen Geometrien; 0, wenn das Warm-up fehlschlägt (nächster Versuch beim
+# nächsten Aufruf, bis dahin werden die Geometrien beim ersten Aufruf geladen)
+def warm_up_geojson_cache():
+    try:
+        return _warm_up_geojson_cache()
+    except Exception:
+        return 0
+
+# Deutsche Ländernamen zu den englischen Namen aus Natural Earth (einmal pro Prozess)
+@st.cache_resource
+def _load_country_names():
+    with get_db_connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT name_en, name FROM countries")
+        return dict(cur.fetchall())
+
+def get_country_names():
+    try:
+        return _load_country_names()
+    except Exception:
+        return {}
+
+# Fehler, bei denen die Schreiber ihre Zeilen liegen lassen statt sie zu verwerfen (Datenbank nicht erreichbar)
+WRITER_TRANSIENT_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError, PoolTimeout)
+
+# Ein Write-Behind-Schreiber pro Prozess, beim Beenden werden alle Ergebnisse geschrieben
+@st.cache_resource
+def get_score_writer():
+    history_cache = get_history_cache()
+    leaderboard = get_leaderboard_service()
+
+    # Historie und Statistiken der Spieler sind nach dem Schreiben veraltet
+    def invalidate(player_ids):
+        for player_id in player_ids:
+            history_cache.invalidate(player_id)
+            leaderboard.invalidate_player(player_id)
+
+    writer = ScoreWriter(get_pool().connection, on_written=invalidate, transient_errors=WRITER_TRANSIENT_ERRORS)
+    atexit.register(writer.close)
+    return writer
+
+# Speichern des Scores (asynchron über die Warteschlange des ScoreWriter)
+@instrumentation.timed("db.save_score_to_db")
 def save_score_to_db(score, rounds, game_mode, player_id):
-    conn = get_db_connection()
-    if conn:
-        try:
-            cur = conn.cursor()
-            cur.execute("INSERT INTO game_history (game_mode, score, rounds, player) VALUES (%s, %s, %s, %s)", (game_mode, score, rounds, player_id,))
-            cur.execute("UPDATE players SET played_games = played_games + 1 WHERE id = %s",(player_id,))
-            conn.commit()
-            conn.close()
-        except Exception as e:
-            st.error(f"SQL Fehler: {e}")
+    try:
+        get_score_writer().submit(score, rounds, game_mode, player_id)
+    except Exception as e:
+        st.error(f"SQL Fehler: {e}")
+
+# Ein Schreiber für das Rundenprotokoll pro Prozess (COPY in round_guesses), beim Beenden wird alles geschrieben
+@st.cache_resource
+def get_guess_writer():
+    writer = GuessWriter(get_pool().connection, transient_errors=WRITER_TRANSIENT_ERRORS)
+    atexit.register(writer.close)
+    return writer
+
+# Protokolliert eine Runde (asynchron); Fehler des Protokolls unterbrechen das Spiel nicht
+@instrumentation.timed("db.log_round_guess")
+def log_round_guess(**values):
+    try:
+        get_guess_writer().submit(**values)
+    except Exception:
+        logger.exception("Runde konnte nicht protokolliert werden")
+
+# Kennzahlen des Write-Behind-Schreibers (Warteschlangenlänge, Flush-Latenz)
+def get_score_writer_stats():
+    return get_score_writer().stats()
+
+# Historien-Cache pro Prozess; ein Eintrag wird verworfen, sobald ein neues Spiel des Spielers geschrieben ist
+@st.cache_resource
+def get_history_cache():
+    return TTLCache()
+
+# Trefferzähler des Historien-Caches
+def get_history_cache_stats():
+    return get_history_cache().stats()
+
+HISTORY_QUERY = """
+    SELECT game_mode, score, rounds, to_char(played_at, 'DD.MM. HH24:MI')
+    FROM game_history
+    WHERE player = %s
+    ORDER BY played_at DESC
+    LIMIT 10
+"""
 
 # Abfrage der letzten 10 Spiele
+@instrumentation.timed("db.get_last_games")
 def get_last_games(player_id):
-    conn = get_db_connection()
-    if not conn: return []
-    cur = conn.cursor()
-    cur.execute("SELECT game_mode, score, rounds, to_char(played_at, 'DD.MM. HH24:MI') FROM game_history WHERE player = %s ORDER BY played_at DESC LIMIT 10;", (player_id,))
-    rows = cur.fetchall()
+    cache = get_history_cache()
+    found, rows = cache.get(player_id)
+    if not found:
+        generation = cache.generation(player_id)
+        with get_db_connection() as conn, conn.cursor() as cur:
+            cur.execute(HISTORY_QUERY, (player_id,))
+            rows = cur.fetchall()
+        cache.put(player_id, rows, generation)
     if not rows: is_empty = True
     else: is_empty = False
-    conn.close()
     return rows, is_empty
 
+# Bestenlisten-Service pro Prozess (TTL-Cache vor den Aggregattabellen)
+@st.cache_resource
+def get_leaderboard_service():
+    return LeaderboardService(get_pool().connection)
+
+# Top-N eines Spielmodus und Schwierigkeitsgrads
+@instrumentation.timed("db.get_leaderboard")
+def get_leaderboard(game_mode, difficulty, n=10):
+    return get_leaderboard_service().top(game_mode, difficulty, n)
+
+# Rang des Spielers in einem Spielmodus und Schwierigkeitsgrad
+@instrumentation.timed("db.get_player_rank")
+def get_player_rank(game_mode, difficulty, player_id):
+    return get_leaderboard_service().player_rank(game_mode, difficulty, player_id)
+
+# Statistiken des Spielers je Spielmodus
+@instrumentation.timed("db.get_player_stats")
+def get_player_stats(player_id):
+    return get_leaderboard_service().player_stats(player_id)
+
+# Challenge-Service pro Prozess; die Orte werden wie bei fetch_game_data samt Geometrien geladen
+@st.cache_resource
+def get_challenge_service():
+    return ChallengeService(get_pool().connection, lambda table_name, count, difficulty, seed: _load_locations(table_name, count, difficulty, seed, preload=True))
+
+# Laufende Challenge des Zeitraums ("daily" oder "hourly") als (ID, Orte)
+@instrumentation.timed("db.fetch_challenge")
+def fetch_challenge(table_name, difficulty, period):
+    try:
+        return get_challenge_service().challenge(table_name, difficulty, period)
+    except Exception as e:
+        st.error(f"SQL Fehler: {e}")
+        return None, []
+
+# Speichern des Challenge-Ergebnisses; False, wenn es nicht gewertet wurde
+@instrumentation.timed("db.save_challenge_result")
+def save_challenge_result(challenge_id, player_id, score, rounds):
+    try:
+        return get_challenge_service().submit(challenge_id, player_id, score, rounds)
+    except Exception as e:
+        st.error(f"SQL Fehler: {e}")
+        return False
+
+# Top-N einer Challenge
+@instrumentation.timed("db.get_challenge_leaderboard")
+def get_challenge_leaderboard(challenge_id, n=10):
+    return get_challenge_service().top(challenge_id, n)
+
+# Rang des Spielers in einer Challenge
+@instrumentation.timed("db.get_challenge_rank")
+def get_challenge_rank(challenge_id, player_id):
+    return get_challenge_service().player_rank(challenge_id, player_id)
+
+# Momentwerte von Pool, Schreiber und Caches für den Metrik-Export; Quellen, die den Pool
+# brauchen, fehlen, solange die Datenbank nicht erreichbar ist
+def get_metrics_gauges():
+    gauges = {}
+    for prefix, stats in [
+        ("db_pool", get_pool_stats),
+        ("score_writer", get_score_writer_stats),
+        ("guess_writer", lambda: get_guess_writer().stats()),
+        ("history_cache", get_history_cache_stats),
+        ("player_cache", get_player_cache_stats),
+        ("challenges", lambda: get_challenge_service().stats()),
+        ("geojson_cache", lambda: get_geojson_cache().stats())
+    ]:
+        try:
+            stats = stats()
+        except Exception:
+            continue
+        for key, value in stats.items():
+            gauges[f"{prefix}_{key}"] = value
+    return gauges
+
+# Name -> Spieler-ID für alle Sessions; Spieler werden nie gelöscht, daher ohne Ablaufzeit
+@st.cache_resource
+def get_player_cache():
+    return TTLCache()
+
+def get_player_cache_stats():
+    return get_player_cache().stats()
+
+# Legt den Spieler an, falls es den Namen noch nicht gibt, und liefert die ID (ein Statement,
+# sicher bei gleichzeitigen Anmeldungen dank players_name_key)
+PLAYER_UPSERT_QUERY = """
+    INSERT INTO players (name, played_games) VALUES (%s, 0)
+    ON CONFLICT (name) DO UPDATE SET name = EXCLUDED.name
+    RETURNING id
+"""
+
 # Anmeldung mit Spielernamen
+@instrumentation.timed("db.log_in")
 def log_in(player_name):
-    conn = get_db_connection()
-    if not conn: return []
-    cur = conn.cursor()
-
-    cur.execute("SELECT id FROM players WHERE name = %s", (player_name,))
-    result = cur.fetchone()
-
-    if result:
-        player_id = result[0]
-
-    else:
-        cur.execute("INSERT INTO players (name, played_games) VALUES (%s, 0)", (player_name,))
-        conn.commit()
-        cur.execute("SELECT id FROM players WHERE name = %s", (player_name,))
-        result = cur.fetchone()
-        player_id = result[0]
-    
-    conn.close()
-    
-    return player_id
\ No newline at end of file
+    cache = get_player_cache()
+    found, player_id = cache.get(player_name)
+    if found:
+        return player_id
+
+    try:
+        with get_db_connection() as conn, conn.cursor() as cur:
+            cur.execute(PLAYER_UPSERT_QUERY, (player_name,))
+            player_id = cur.fetchone()[0]
+    except Exception as e:
+        st.error(f"Datenbank-Verbindungsfehler: {e}")
+        return None
+
+    cache.put(player_name, player_id)
+    return player_id
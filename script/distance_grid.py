@@ -0,0 +1,80 @@
+# Vorberechnete Distanzraster für die Länderwertung (erzeugt von get_country_data/build_distance_grid.py)
+#
+# Pro Land ein Raster über die Bounding Box plus LIMIT_KM ringsum. Jede Zelle enthält die Distanz
+# zum Land (0 im Land) als uint16 in Schritten von LIMIT_KM / SCALE; CLIPPED steht für "mindestens
+# LIMIT_KM". Eine Abfrage interpoliert bilinear zwischen den vier umliegenden Rasterpunkten.
+# Liegt der Tipp außerhalb des Rasters oder ist ein Nachbar abgeschnitten, gibt es keinen Wert;
+# die Distanz für die Anzeige wird dann wie bisher genau berechnet (die Wertung ist dort ohnehin 0).
+# Die Datei ist optional und nicht eingecheckt; ohne sie liefert distance_to_country_km None.
+
+import os
+from functools import lru_cache
+
+import country_store
+
+GRID_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "get_country_data", "distance_grid.bin")
+
+SCALE = 65534
+CLIPPED = 65535
+
+
+class DistanceGrid:
+    def __init__(self, path=GRID_PATH):
+        self._mmap, header, arrays = country_store.map_store(path)
+        self.names = header["names"]
+        self.step = header["step"]
+        self.limit_km = header["limit_km"]
+        self._origins = arrays["origins"].tolist()
+        self._grids = [arrays[f"grid/{i}"] for i in range(len(self.names))]
+        self._index = {name: i for i, name in enumerate(self.names)}
+
+    def __contains__(self, name):
+        return name in self._index
+
+    # Interpolierte Distanz in km oder None (Land fehlt, Punkt außerhalb oder jenseits von limit_km)
+    def distance_km(self, lat, lon, name):
+        i = self._index.get(name)
+        if i is None:
+            return None
+        grid = self._grids[i]
+        lat0, lon0 = self._origins[i]
+        rows, columns = grid.shape
+
+        y = (lat - lat0) / self.step
+        if not 0 <= y <= rows - 1:
+            return None
+        # Raster können über ±180° hinausreichen (Fidschi, Russland)
+        lon = (lon + 180.0) % 360.0 - 180.0
+        for shifted in (lon, lon + 360.0, lon - 360.0):
+            x = (shifted - lon0) / self.step
+            if 0 <= x <= columns - 1:
+                break
+        else:
+            return None
+
+        row, column = min(int(y), rows - 2), min(int(x), columns - 2)
+        fy, fx = y - row, x - column
+        v00, v01 = int(grid[row, column]), int(grid[row, column + 1])
+        v10, v11 = int(grid[row + 1, column]), int(grid[row + 1, column + 1])
+        if CLIPPED in (v00, v01, v10, v11):
+            return None
+
+        value = (v00 * (1 - fx) + v01 * fx) * (1 - fy) + (v10 * (1 - fx) + v11 * fx) * fy
+        return value * self.limit_km / SCALE
+
+
+# Einmal pro Prozess eingeblendetes Raster oder None, wenn die Datei nicht erzeugt wurde
+@lru_cache(maxsize=1)
+def get_grid():
+    if not os.path.exists(GRID_PATH):
+        return None
+    return DistanceGrid(GRID_PATH)
+
+
+# Distanz in km zwischen Tipp und Land aus dem Raster oder None (dann genau berechnen)
+def distance_to_country_km(guess, country_en):
+    grid = get_grid()
+    if grid is None:
+        return None
+    lat, lon = guess
+    return grid.distance_km(lat, lon, country_en)
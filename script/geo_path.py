@@ -0,0 +1,82 @@
+# Großkreislinie zwischen Tipp und Lösung für die Ergebnisanzeige
+#
+# Alle Zwischenpunkte werden in einem NumPy-Schritt berechnet, die Punktanzahl richtet sich
+# nach der Bogenlänge. Linien über den 180. Längengrad werden dort aufgeteilt, damit folium
+# keine Linie quer über die Karte zeichnet. Ergebnisse werden pro (Tipp, Lösung) gemerkt.
+
+from functools import lru_cache
+
+import numpy as np
+from geopy.distance import EARTH_RADIUS
+
+KM_PER_POINT = 50.0
+MIN_POINTS = 2
+MAX_POINTS = 256
+
+# Nachkommastellen der Koordinaten im Cache-Schlüssel (ca. 1 cm)
+KEY_DECIMALS = 7
+
+
+def _normalize_lon(lon):
+    return (lon + 180.0) % 360.0 - 180.0
+
+
+# Zwischenpunkte (lat, lon) in Grad auf dem Großkreis, Längengrade fortlaufend (ohne Sprung bei ±180)
+def _interpolate(start, end):
+    lat1, lon1 = np.radians(start)
+    lat2, lon2 = np.radians(end)
+    a = np.array([np.cos(lat1) * np.cos(lon1), np.cos(lat1) * np.sin(lon1), np.sin(lat1)])
+    b = np.array([np.cos(lat2) * np.cos(lon2), np.cos(lat2) * np.sin(lon2), np.sin(lat2)])
+    d = np.arctan2(np.linalg.norm(np.cross(a, b)), a @ b)
+    if d == 0:
+        return None
+
+    n = int(np.clip(np.ceil(d * EARTH_RADIUS / KM_PER_POINT), MIN_POINTS, MAX_POINTS))
+    f = np.linspace(0.0, 1.0, n + 1)[:, None]
+    points = (np.sin((1 - f) * d) * a + np.sin(f * d) * b) / np.sin(d)
+
+    lat = np.degrees(np.arctan2(points[:, 2], np.hypot(points[:, 0], points[:, 1])))
+    lon = np.degrees(np.unwrap(np.arctan2(points[:, 1], points[:, 0])))
+    return lat, lon
+
+
+# Teilt einen fortlaufenden Linienzug an den Vielfachen von ±180° in Abschnitte auf
+def _split_at_antimeridian(lat, lon):
+    segments = []
+    shift = np.floor((lon + 180.0) / 360.0)
+    breaks = np.nonzero(np.diff(shift))[0]
+
+    start = 0
+    current = [(lat[0], lon[0] - 360.0 * shift[0])]
+    for i in breaks:
+        # Schnittpunkt mit dem Längengrad 180 (bzw. -180) linear zwischen Punkt i und i+1
+        boundary = 180.0 + 360.0 * min(shift[i], shift[i + 1])
+        t = (boundary - lon[i]) / (lon[i + 1] - lon[i])
+        cross_lat = lat[i] + t * (lat[i + 1] - lat[i])
+
+        current.extend((lat[j], lon[j] - 360.0 * shift[j]) for j in range(start + 1, i + 1))
+        edge = 180.0 if shift[i + 1] > shift[i] else -180.0
+        current.append((cross_lat, edge))
+        segments.append(current)
+
+        current = [(cross_lat, -edge)]
+        start = i
+    current.extend((lat[j], lon[j] - 360.0 * shift[j]) for j in range(start + 1, len(lat)))
+    segments.append(current)
+
+    return tuple(tuple((float(a), float(b)) for a, b in segment) for segment in segments)
+
+
+@lru_cache(maxsize=1024)
+def _cached_path(start, end):
+    interpolated = _interpolate(start, end)
+    if interpolated is None:
+        return ((start, end),)
+    return _split_at_antimeridian(*interpolated)
+
+
+# Berechnet eine gebogene Linie auf der Karte als Liste von Abschnitten [(lat, lon), ...]
+def great_circle_path(start, end):
+    start = (round(float(start[0]), KEY_DECIMALS), round(_normalize_lon(float(start[1])), KEY_DECIMALS))
+    end = (round(float(end[0]), KEY_DECIMALS), round(_normalize_lon(float(end[1])), KEY_DECIMALS))
+    return _cached_path(start, end)
\ No newline at end of file
@@ -0,0 +1,85 @@
+# Serverseitiger Cache für vorserialisierte Länder-GeoJSON
+#
+# Die Karte erlaubt nur Zoomstufen 2–6, daher werden pro Land vereinfachte Varianten
+# vorgehalten (ST_SimplifyPreserveTopology + reduzierte Nachkommastellen). Der Cache ist
+# ein LRU mit Größenbegrenzung in Bytes und wird von allen Sessions gemeinsam genutzt.
+
+import math
+import threading
+from collections import OrderedDict
+
+# Zoomstufe -> (Toleranz in Grad, Nachkommastellen); Toleranz 0 liefert die Originalgeometrie
+SIMPLIFY_LEVELS = {
+    2: (0.2, 2),
+    4: (0.05, 3),
+    6: (0.0, 4)
+}
+
+MIN_ZOOM = 2
+MAX_ZOOM = 6
+
+
+# Kleinste vereinfachte Stufe, die für die Zoomstufe noch genau genug ist
+def level_for_zoom(zoom=None):
+    if zoom is None:
+        return MAX_ZOOM
+    for level in sorted(SIMPLIFY_LEVELS):
+        if zoom <= level:
+            return level
+    return MAX_ZOOM
+
+
+# Schätzt die Zoomstufe, auf die fit_bounds für die Ausdehnung in Grad ungefähr springt
+def zoom_for_bounds(bounds):
+    (lat1, lon1), (lat2, lon2) = bounds
+    span = max(abs(lat2 - lat1), abs(lon2 - lon1), 1e-6)
+    zoom = math.floor(math.log2(1400 / span)) - 1
+    return max(MIN_ZOOM, min(MAX_ZOOM, zoom))
+
+
+class GeoJsonCache:
+    def __init__(self, max_bytes=16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, country_name, level):
+        key = (country_name, level)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[0]
+
+    def put(self, country_name, level, geojson):
+        key = (country_name, level)
+        size = len(geojson.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old[1]
+            self._entries[key] = (geojson, size)
+            self._size += size
+
+            # Älteste Einträge verwerfen, bis die Größengrenze wieder eingehalten ist
+            while self._size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), bytes=self._size, max_bytes=self.max_bytes)
\ No newline at end of file
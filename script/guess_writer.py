@@ -0,0 +1,57 @@
+# Protokoll aller Runden (Klick, Ziel, Distanz, Punkte) für Auswertungen
+#
+# round_guesses ist nach Monat partitioniert und wird nur angehängt (siehe SQL.txt). Der
+# GuessWriter nutzt die Warteschlange und Wiederholungslogik des ScoreWriter, schreibt die
+# Batches aber mit COPY statt INSERT. Enthält ein Batch einen Monat, für den noch keine Partition
+# angelegt wurde, legt create_round_guess_partitions sie samt den folgenden Monaten vorher an. Es
+# gibt keine DEFAULT-Partition: schlägt COPY fehl (z. B. Partition gelöscht), wird beim nächsten
+# Versuch erneut angelegt.
+# Auslesen: analytics/export_round_guesses.py
+
+import csv
+import io
+from datetime import datetime
+
+import instrumentation
+from score_writer import ScoreWriter
+
+# Spalten in der Reihenfolge der Zeilen und der COPY-Anweisung
+COLUMNS = (
+    "played_at", "player", "game_mode", "challenge_id", "round", "location_table", "location_name",
+    "target_lat", "target_lon", "guess_lat", "guess_lon", "clicked_country", "distance_km", "points"
+)
+
+COPY_QUERY = f"COPY round_guesses ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+PARTITIONS_QUERY = "SELECT create_round_guess_partitions(%s, %s, %s)"
+
+
+class GuessWriter(ScoreWriter):
+    def __init__(self, connection, months_ahead=2, batch_size=1000, flush_interval=2.0, **kwargs):
+        super().__init__(connection, batch_size=batch_size, flush_interval=flush_interval, thread_name="guess-writer", **kwargs)
+        self.months_ahead = months_ahead
+        # Monate, deren Partitionen dieser Prozess angelegt hat
+        self._partition_months = set()
+
+    # Legt eine Runde in die Warteschlange; Schlüssel wie COLUMNS, played_at wird gesetzt
+    def submit(self, **values):
+        values.setdefault("played_at", datetime.now())
+        self._enqueue(tuple(values.get(column) for column in COLUMNS))
+
+    @instrumentation.timed("db.guess_writer_batch")
+    def _write_batch(self, batch):
+        # None wird als leeres, nicht gequotetes Feld geschrieben und von COPY als NULL gelesen
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(batch)
+        buffer.seek(0)
+
+        first, last = min(row[0] for row in batch), max(row[0] for row in batch)
+        months = {row[0].strftime("%Y-%m") for row in batch}
+        try:
+            with self.connection() as conn, conn.cursor() as cur:
+                if not months <= self._partition_months:
+                    cur.execute(PARTITIONS_QUERY, (first.date(), last.date(), self.months_ahead))
+                cur.copy_expert(COPY_QUERY, buffer)
+        except Exception:
+            self._partition_months.clear()
+            raise
+        self._partition_months |= months
@@ -0,0 +1,153 @@
+# Zeitmessung der Datenbankfunktionen und Render-Phasen
+#
+# Aktiviert über die Umgebungsvariable CITY_GUESSER_METRICS=1. Ohne sie gibt timed() die
+# Funktion unverändert zurück und span() einen gemeinsamen leeren Kontext, der Aufwand ist
+# damit praktisch null. Die Messwerte werden im Prozess aggregiert (Anzahl, Summe, Maximum,
+# Histogramm) und als Prometheus-Text exportiert; mit CITY_GUESSER_METRICS_PORT zusätzlich
+# über einen kleinen HTTP-Server unter /metrics.
+
+import functools
+import os
+import re
+import threading
+import time
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ENABLED = os.environ.get("CITY_GUESSER_METRICS", "") not in ("", "0")
+METRICS_PORT = os.environ.get("CITY_GUESSER_METRICS_PORT")
+
+# Obergrenzen der Histogramm-Buckets in Sekunden
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timers = {}
+
+    def record(self, name, seconds):
+        with self._lock:
+            timer = self._timers.get(name)
+            if timer is None:
+                timer = self._timers[name] = {"count": 0, "sum": 0.0, "max": 0.0, "buckets": [0] * len(BUCKETS)}
+            timer["count"] += 1
+            timer["sum"] += seconds
+            timer["max"] = max(timer["max"], seconds)
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    timer["buckets"][i] += 1
+                    break
+
+    # Zeilen für die Anzeige: Name, Anzahl, Mittel, Maximum und Summe in ms
+    def snapshot(self):
+        with self._lock:
+            return [
+                {
+                    "name": name,
+                    "count": timer["count"],
+                    "mean_ms": timer["sum"] / timer["count"] * 1000,
+                    "max_ms": timer["max"] * 1000,
+                    "total_ms": timer["sum"] * 1000
+                }
+                for name, timer in sorted(self._timers.items())
+            ]
+
+    # Prometheus-Textformat; gauges sind zusätzliche Momentwerte wie {"db_pool_in_use": 3}
+    def render_prometheus(self, gauges=None):
+        lines = [
+            "# HELP city_guesser_duration_seconds Laufzeit instrumentierter Abschnitte",
+            "# TYPE city_guesser_duration_seconds histogram"
+        ]
+        with self._lock:
+            timers = {name: dict(timer, buckets=list(timer["buckets"])) for name, timer in sorted(self._timers.items())}
+        for name, timer in timers.items():
+            cumulative = 0
+            for bound, count in zip(BUCKETS, timer["buckets"]):
+                cumulative += count
+                lines.append(f'city_guesser_duration_seconds_bucket{{name="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'city_guesser_duration_seconds_bucket{{name="{name}",le="+Inf"}} {timer["count"]}')
+            lines.append(f'city_guesser_duration_seconds_sum{{name="{name}"}} {timer["sum"]}')
+            lines.append(f'city_guesser_duration_seconds_count{{name="{name}"}} {timer["count"]}')
+
+        for name, value in sorted((gauges or {}).items()):
+            metric = "city_guesser_" + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._timers.clear()
+
+
+metrics = Metrics()
+_NULL_SPAN = nullcontext()
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        metrics.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+# Kontextmanager für einen Abschnitt, z. B. with span("render.map"): ...
+def span(name):
+    return _Span(name) if ENABLED else _NULL_SPAN
+
+
+# Decorator für Funktionen; ohne aktivierte Metriken bleibt die Funktion unverändert
+def timed(name):
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metrics.record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+# Startet einmal pro Prozess einen HTTP-Server, der /metrics im Prometheus-Format liefert
+def start_http_server(port, gauges=None):
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return _server
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus(gauges() if gauges else None).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        _server = ThreadingHTTPServer(("", int(port)), Handler)
+        threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _server
\ No newline at end of file
@@ -0,0 +1,133 @@
+# Bestenlisten und Spielerstatistiken
+#
+# player_stats wird per Trigger bei jedem neuen Eintrag in game_history fortgeschrieben,
+# die Ränge stehen in der materialisierten Sicht leaderboard (siehe SQL.txt). Abfragen sind
+# damit Indexzugriffe ohne Scan über game_history. Davor liegt ein TTL-Cache im Prozess;
+# die Sicht wird höchstens alle refresh_interval Sekunden neu berechnet.
+
+import threading
+import time
+
+from ttl_cache import TTLCache
+
+TOP_QUERY = """
+    SELECT rank, name, best_score, games
+    FROM leaderboard
+    WHERE game_mode = %s AND rank <= %s
+    ORDER BY rank, name
+"""
+
+RANK_QUERY = """
+    SELECT rank, best_score, players
+    FROM leaderboard
+    WHERE game_mode = %s AND player = %s
+"""
+
+STATS_QUERY = """
+    SELECT game_mode, games, best_score,
+           round(total_score::numeric / games, 1) AS avg_score,
+           round(total_score::numeric / NULLIF(total_rounds, 0), 2) AS avg_points_per_round,
+           current_streak, best_streak
+    FROM player_stats
+    WHERE player = %s
+    ORDER BY game_mode
+"""
+
+REFRESH_LOCK_QUERY = """
+    SELECT pg_try_advisory_xact_lock(hashtext('leaderboard'))
+"""
+
+
+# Spielmodus wie in game_history gespeichert, z. B. "Städte (Mittel)"
+def mode_key(game_mode, difficulty):
+    return f"{game_mode} ({difficulty})"
+
+
+class LeaderboardService:
+    def __init__(self, connection, ttl=30.0, refresh_interval=60.0):
+        self.connection = connection
+        self.refresh_interval = refresh_interval
+        self._cache = TTLCache(ttl)
+        self._lock = threading.Lock()
+        self._refreshed_at = None
+        self._refreshing = False
+
+    # Berechnet die materialisierte Sicht neu, wenn sie älter als refresh_interval ist. Der
+    # Zeitpunkt wird erst nach einem erfolgreichen REFRESH gesetzt; _refreshing verhindert, dass
+    # mehrere Threads des Prozesses gleichzeitig neu berechnen.
+    def refresh_if_stale(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._refreshing or (self._refreshed_at is not None and now - self._refreshed_at < self.refresh_interval):
+                return False
+            self._refreshing = True
+
+        try:
+            with self.connection() as conn, conn.cursor() as cur:
+                # Nur ein Prozess berechnet gleichzeitig neu
+                cur.execute(REFRESH_LOCK_QUERY)
+                if not cur.fetchone()[0]:
+                    return False
+                cur.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY leaderboard")
+            with self._lock:
+                self._refreshed_at = now
+        finally:
+            with self._lock:
+                self._refreshing = False
+        self._cache.clear()
+        return True
+
+    # Gecachter Wert als (True, Wert) oder (False, None), für Aufrufer mit eigenem Treiber (async_database)
+    def lookup(self, key):
+        return self._cache.get(key)
+
+    # Mit generation (vor der Abfrage gelesen) wird nicht gespeichert, wenn der Schlüssel inzwischen invalidiert wurde
+    def remember(self, key, value, generation=None):
+        self._cache.put(key, value, generation)
+
+    def generation(self, key):
+        return self._cache.generation(key)
+
+    # Verwirft die Statistiken des Spielers, z. B. nachdem ein neues Spiel geschrieben wurde
+    def invalidate_player(self, player_id):
+        self._cache.invalidate(self.stats_request(player_id)[0])
+
+    def _cached(self, key, query, params, fetch_one=False):
+        found, value = self.lookup(key)
+        if found:
+            return value
+
+        self.refresh_if_stale()
+        generation = self.generation(key)
+        with self.connection() as conn, conn.cursor() as cur:
+            cur.execute(query, params)
+            value = cur.fetchone() if fetch_one else cur.fetchall()
+        self.remember(key, value, generation)
+        return value
+
+    # Abfragen als (Cache-Schlüssel, SQL, Parameter, nur eine Zeile)
+    def top_request(self, game_mode, difficulty, n=10):
+        key = mode_key(game_mode, difficulty)
+        return ("top", key, n), TOP_QUERY, (key, n), False
+
+    def rank_request(self, game_mode, difficulty, player_id):
+        key = mode_key(game_mode, difficulty)
+        return ("rank", key, player_id), RANK_QUERY, (key, player_id), True
+
+    def stats_request(self, player_id):
+        return ("stats", player_id), STATS_QUERY, (player_id,), False
+
+    # Top-N eines Spielmodus als Liste (Rang, Name, Bestwert, Spiele)
+    def top(self, game_mode, difficulty, n=10):
+        return self._cached(*self.top_request(game_mode, difficulty, n))
+
+    # Rang eines Spielers als (Rang, Bestwert, Spieler im Modus) oder None
+    def player_rank(self, game_mode, difficulty, player_id):
+        return self._cached(*self.rank_request(game_mode, difficulty, player_id))
+
+    # Statistiken eines Spielers je Spielmodus
+    def player_stats(self, player_id):
+        return self._cached(*self.stats_request(player_id))
+
+    def stats(self):
+        return self._cache.stats()
\ No newline at end of file
@@ -0,0 +1,102 @@
+# Zufallsauswahl von Orten ohne ORDER BY RANDOM()
+#
+# Pro (Tabelle, Schwierigkeit) wird die sortierte Liste der IDs im Speicher gehalten
+# (geladen über den Index auf (difficulty, id)). Gezogen werden n verschiedene IDs in O(n),
+# die Zeilen werden anschließend gesammelt über den Primärschlüssel abgefragt.
+# Änderungen an den Tabellen erhöhen per Trigger einen Zähler in location_versions,
+# der höchstens alle refresh_interval Sekunden geprüft wird. Fehlt die Zeile einer Tabelle oder
+# die Tabelle location_versions selbst, wird die ID-Liste bei jedem Aufruf neu geladen.
+
+import logging
+import random
+import threading
+import time
+
+from psycopg2 import errors
+
+logger = logging.getLogger(__name__)
+
+LOCATION_TABLES = ["cities", "countries", "berge", "gebaeude"]
+
+
+class LocationSampler:
+    def __init__(self, refresh_interval=30.0):
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._id_lists = {}
+        self._versions = {}
+        self._versions_checked_at = None
+        self._versions_missing = False
+
+    # Liest die Versionszähler aller Ortstabellen (höchstens alle refresh_interval Sekunden)
+    def _current_versions(self, cur):
+        now = time.monotonic()
+        with self._lock:
+            if self._versions_checked_at is not None and now - self._versions_checked_at < self.refresh_interval:
+                return self._versions
+
+        # Savepoint, damit eine fehlende Tabelle die Transaktion des Aufrufers nicht abbricht
+        cur.execute("SAVEPOINT location_versions")
+        try:
+            cur.execute("SELECT table_name, version FROM location_versions")
+            versions = dict(cur.fetchall())
+            cur.execute("RELEASE SAVEPOINT location_versions")
+        except errors.UndefinedTable:
+            cur.execute("ROLLBACK TO SAVEPOINT location_versions")
+            if not self._versions_missing:
+                logger.warning("Tabelle location_versions fehlt (siehe SQL.txt), ID-Listen werden nicht zwischengespeichert")
+            self._versions_missing = True
+            versions = {}
+        else:
+            self._versions_missing = False
+        with self._lock:
+            self._versions = versions
+            self._versions_checked_at = now
+        return versions
+
+    # Sortierte ID-Liste für Tabelle und Schwierigkeit, neu geladen bei geänderter Version
+    def _ids(self, cur, table_name, difficulty):
+        version = self._current_versions(cur).get(table_name)
+        key = (table_name, difficulty)
+        with self._lock:
+            cached = self._id_lists.get(key)
+        if version is not None and cached and cached[0] == version:
+            return cached[1]
+
+        cur.execute(f"SELECT id FROM {table_name} WHERE difficulty = %s ORDER BY id", (difficulty,))
+        ids = tuple(row[0] for row in cur.fetchall())
+        if version is None:
+            # Ohne Versionszähler ließen sich Änderungen nicht erkennen, daher nicht zwischenspeichern
+            if not self._versions_missing:
+                logger.warning("Keine Zeile für %s in location_versions (siehe SQL.txt), ID-Liste wird nicht zwischengespeichert", table_name)
+            return ids
+        with self._lock:
+            self._id_lists[key] = (version, ids)
+        return ids
+
+    # Zieht count verschiedene IDs; mit seed ist die Auswahl reproduzierbar
+    def sample_ids(self, cur, table_name, difficulty, count, seed=None):
+        if table_name not in LOCATION_TABLES:
+            raise ValueError(f"Unbekannte Tabelle: {table_name}")
+        ids = self._ids(cur, table_name, difficulty)
+        rng = random.Random(seed) if seed is not None else random
+        return rng.sample(ids, min(count, len(ids)))
+
+    # Fragt die Zeilen zu den IDs in einem Aufruf ab und behält die gezogene Reihenfolge bei
+    def fetch_rows(self, cur, table_name, columns, ids):
+        if not ids:
+            return []
+        cur.execute(f"SELECT id, {', '.join(columns)} FROM {table_name} WHERE id = ANY(%s)", (list(ids),))
+        rows = {row[0]: row[1:] for row in cur.fetchall()}
+        return [rows[i] for i in ids if i in rows]
+
+    # Verwirft alle zwischengespeicherten ID-Listen
+    def invalidate(self):
+        with self._lock:
+            self._id_lists.clear()
+            self._versions_checked_at = None
+        self._versions_missing = False
+
+    def stats(self):
+        with self._lock:
+            return {f"{table}/{difficulty}": len(ids) for (table, difficulty), (_, ids) in self._id_lists.items()}
\ No newline at end of file
@@ -2,40 +2,25 @@
 
 import streamlit as st
 import folium
-from streamlit_folium import st_folium
 from geopy.distance import geodesic
 import pandas as pd
 import database_connection as db
-import math 
-
-# Berechnet eine gebogene Linie auf der Kart
-def get_geodesic_path(start, end, n=100):
-    lat1, lon1 = math.radians(start[0]), math.radians(start[1])
-    lat2, lon2 = math.radians(end[0]), math.radians(end[1])
-    d = 2 * math.asin(math.sqrt(math.sin((lat2 - lat1) / 2) ** 2 +
-                                math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2))
-    if d == 0: return [start, end]
-    path = []
-    for i in range(n + 1):
-        f = i / n
-        a = math.sin((1 - f) * d) / math.sin(d)
-        b = math.sin(f * d) / math.sin(d)
-        x = a * math.cos(lat1) * math.cos(lon1) + b * math.cos(lat2) * math.cos(lon2)
-        y = a * math.cos(lat1) * math.sin(lon1) + b * math.cos(lat2) * math.sin(lon2)
-        z = a * math.sin(lat1) + b * math.sin(lat2)
-        lat = math.atan2(z, math.sqrt(x**2 + y**2))
-        lon = math.atan2(y, x)
-        path.append([math.degrees(lat), math.degrees(lon)])
-    return path
-
-# Berechnet die Punkte basierend auf der Distanz zum tatsächlichen Standort
-def calculate_score(distance_km):
-    limit_km = 1000.0
-    max_points = 10.0
-    if distance_km >= limit_km:
-        return 0
-    points = (1 - (distance_km / limit_km)) * max_points
-    return int(round(points))
+import async_database
+import geojson_cache
+import map_rendering
+from scoring import calculate_score
+from geo_path import great_circle_path
+from country_index import country_at, get_index
+from leaderboard import mode_key
+from challenges import CHALLENGE_ROUNDS
+import instrumentation
+from instrumentation import span
+
+# Lädt nach dem Spielstart das nächste Spiel mit gleichen Einstellungen im Hintergrund vor
+PREFETCH_NEXT_GAME = True
+
+# Spielart -> Zeitraum der Challenge (None: eigene Zufallsauswahl)
+GAME_TYPES = {"Freies Spiel": None, "Tages-Challenge": "daily", "Stunden-Challenge": "hourly"}
 
 # --- SPIELZUSTAND MANAGEMENT ---
 
@@ -45,49 +30,75 @@ def reset_game():
     st.session_state.game_started = False
     st.session_state.turn_over = False
     st.session_state.last_click = None
+    st.session_state.clicked_country = None
     st.session_state.current_round_score = 0
     st.session_state.score_saved = False
     st.session_state.rounds_per_game = 5
     st.session_state.location_list = []
     st.session_state.current_dist = 0
+    st.session_state.challenge_id = None
+    st.session_state.challenge_counted = True
 
-def start_game():
-    st.session_state.game_started = True
-
-    # Bestimmt den Tabellennamen in der Datenbank
-    mode = st.session_state.game_mode
-    match mode:
+# Tabellenname und Schwierigkeit in der Datenbank zu den gewählten Einstellungen
+def table_and_difficulty():
+    match st.session_state.game_mode:
         case "Städte": table_name = "cities"
         case "Länder": table_name = "countries"
         case "Berge": table_name = "berge"
         case "Gebäude": table_name = "gebaeude"
-        case _:
-            st.error("Unbekannter Spielmodus!")
-            return
+        case _: table_name = None
 
     # Mapping für Schwierigkeit
     diff_map = {"Leicht": "easy", "Mittel": "medium", "Schwer": "hard"}
-    db_diff = diff_map[st.session_state.difficulty_selection]
+    return table_name, diff_map[st.session_state.difficulty_selection]
+
+def start_game():
+    st.session_state.game_started = True
+
+    # Bestimmt den Tabellennamen in der Datenbank
+    table_name, db_diff = table_and_difficulty()
+    if table_name is None:
+        st.error("Unbekannter Spielmodus!")
+        return
+
+    # Challenge: gemeinsamer Satz Orte für alle Spieler aus dem Prozess-Cache
+    period = GAME_TYPES[st.session_state.game_type]
+    if period:
+        st.session_state.challenge_id, st.session_state.location_list = db.fetch_challenge(table_name, db_diff, period)
+        st.session_state.rounds_per_game = len(st.session_state.location_list) or CHALLENGE_ROUNDS
+        if not st.session_state.location_list:
+            st.error("Keine Daten gefunden! Prüfe die Datenbank oder Kategorie.")
+        return
 
-    # Fragt Daten (Städte, Länder, Gebäude, etc) aus der Datenbnak ab
+    # Fragt alle Daten des Spiels (Städte, Länder, Gebäude, etc. inkl. Ländergeometrien) aus der Datenbnak ab
+    game_key = (table_name, st.session_state.rounds_per_game, db_diff)
     try:
-        st.session_state.location_list = db.fetch_random_locations(
-            table_name, 
-            st.session_state.rounds_per_game,
-            db_diff
-        )
+        st.session_state.location_list = take_prefetched_game(game_key) or db.fetch_game_data(*game_key)
 
         if not st.session_state.location_list:
             st.error("Keine Daten gefunden! Prüfe die Datenbank oder Kategorie.")
+        elif PREFETCH_NEXT_GAME:
+            st.session_state.prefetched_game = (game_key, db.prefetch_game_data(*game_key))
 
     except Exception as e:
         st.error(f"Datenbankfehler: {e}")
         st.session_state.location_list = []
 
+# Übernimmt ein im Hintergrund vorgeladenes Spiel, falls es zu den Einstellungen passt und fertig ist
+def take_prefetched_game(game_key):
+    prefetched = st.session_state.pop("prefetched_game", None)
+    if not prefetched:
+        return []
+    key, future = prefetched
+    if key != game_key or not future.done() or future.exception():
+        return []
+    return future.result()
+
 def next_round():
     st.session_state.round += 1
     st.session_state.turn_over = False
     st.session_state.last_click = None
+    st.session_state.clicked_country = None
     st.session_state.current_dist = 0
 
 def set_player_name():
@@ -102,6 +113,16 @@ def set_player_name():
 
 st.set_page_config(page_title="City Guesser", layout="wide")
 
+# Länder-GeoJSON einmal pro Prozess vorladen
+db.warm_up_geojson_cache()
+
+# Räumlichen Länderindex für die Klickauswertung einmal pro Prozess aufbauen
+get_index()
+
+# Prometheus-Endpunkt für die Laufzeitmetriken (einmal pro Prozess)
+if instrumentation.ENABLED and instrumentation.METRICS_PORT:
+    instrumentation.start_http_server(instrumentation.METRICS_PORT, async_database.get_metrics_gauges)
+
 if 'player_name' not in st.session_state:
     st.session_state.player_name = ""
     st.session_state.player_id = None
@@ -152,17 +173,34 @@ with st.sidebar:
     if st.session_state.player_name:
         st.header("Historie")
         try:
-            history_data, is_empty = db.get_last_games(st.session_state.player_id)
+            # Historie und Statistiken werden gleichzeitig abgefragt
+            (history_data, is_empty), player_stats = async_database.player_overview(st.session_state.player_id)
             if is_empty:
                 st.caption(f"Noch keine Spiele gespielt als {st.session_state.player_name}.")
             else:
                 formatted_hist = [[gm, f"{sc}/{r*10}", dt] for gm, sc, r, dt in history_data]
                 st.subheader("📜 Letzte 10 Spiele")
                 st.dataframe(pd.DataFrame(formatted_hist, columns = ["Modus", "Punkte", "Zeitpunkt"]), hide_index=True) 
+            if player_stats:
+                st.subheader("📊 Statistiken")
+                formatted_stats = [[gm, games, best, avg, streak] for gm, games, best, avg, _, streak, _ in player_stats]
+                st.dataframe(pd.DataFrame(formatted_stats, columns = ["Modus", "Spiele", "Bestwert", "Schnitt", "Serie"]), hide_index=True)
 
         except Exception as e:
             st.error(f"Datenbankfehler aufgetreten: {e}")
 
+    # Debug-Panel mit Laufzeitmetriken (nur mit CITY_GUESSER_METRICS=1)
+    if instrumentation.ENABLED:
+        with st.expander("🔧 Debug: Metriken"):
+            try:
+                gauges = async_database.get_metrics_gauges()
+            except Exception as e:
+                st.error(f"Datenbankfehler aufgetreten: {e}")
+                gauges = {}
+            st.dataframe(pd.DataFrame(instrumentation.metrics.snapshot()), hide_index=True)
+            st.json(gauges, expanded=False)
+            st.download_button("Prometheus-Export", instrumentation.metrics.render_prometheus(gauges), file_name="metrics.txt")
+
 
 # Hauptbereich
 st.title("🌍 City Guesser Quiz")
@@ -174,6 +212,7 @@ if not st.session_state.game_started:
     with c1:
         st.session_state.game_mode = st.radio("Was suchen wir?", ["Städte", "Länder", "Berge", "Gebäude"])
         st.session_state.quiz_type = st.radio("Spielweise", ["Klassisch (Name)", "Rätsel (Umschreibung)"])
+        st.session_state.game_type = st.radio("Spielart", list(GAME_TYPES), horizontal=True)
     with c2:
         st.session_state.difficulty_selection = st.select_slider("Schwierigkeit", ["Leicht", "Mittel", "Schwer"], value="Mittel")
         
@@ -182,15 +221,54 @@ if not st.session_state.game_started:
         else:
             max_rounds = 20
 
-        st.session_state.rounds_per_game = st.slider(
-            "Anzahl Runden",
-            min_value=1,
-            max_value=max_rounds,
-            value=min(st.session_state.get("rounds_per_game", 5), max_rounds)
-        )
+        # Challenges haben eine feste Rundenzahl
+        if GAME_TYPES[st.session_state.game_type]:
+            st.caption(f"Challenge: {CHALLENGE_ROUNDS} Runden, für alle Spieler dieselben Orte. Gewertet wird das erste Spiel.")
+        else:
+            st.session_state.rounds_per_game = st.slider(
+                "Anzahl Runden",
+                min_value=1,
+                max_value=max_rounds,
+                value=min(st.session_state.get("rounds_per_game", 5), max_rounds)
+            )
     st.markdown("<br>", unsafe_allow_html=True)
     st.button("Spiel starten", type="primary", on_click=start_game)
 
+    # Rangliste der laufenden Challenge
+    period = GAME_TYPES[st.session_state.game_type]
+    if period:
+        st.markdown(f"### 🏅 {st.session_state.game_type}")
+        try:
+            challenge_id, _ = db.fetch_challenge(*table_and_difficulty(), period)
+            if challenge_id is not None:
+                challenge_top = db.get_challenge_leaderboard(challenge_id)
+                if not challenge_top:
+                    st.caption("Noch niemand hat diese Challenge gespielt.")
+                else:
+                    st.dataframe(pd.DataFrame(challenge_top, columns = ["Rang", "Name", "Punkte"]), hide_index=True)
+
+                challenge_rank = db.get_challenge_rank(challenge_id, st.session_state.player_id) if st.session_state.player_id else None
+                if challenge_rank:
+                    st.caption(f"Dein Rang: {challenge_rank[0]} von {challenge_rank[2]} ({challenge_rank[1]} Punkte)")
+
+        except Exception as e:
+            st.error(f"Datenbankfehler aufgetreten: {e}")
+
+    # Bestenliste für den gewählten Spielmodus und Schwierigkeitsgrad
+    st.markdown("### 🏆 Bestenliste")
+    try:
+        top_players, player_rank = async_database.leaderboard_view(st.session_state.game_mode, st.session_state.difficulty_selection, st.session_state.player_id)
+        if not top_players:
+            st.caption("Noch keine Ergebnisse in diesem Modus.")
+        else:
+            st.dataframe(pd.DataFrame(top_players, columns = ["Rang", "Name", "Bestwert", "Spiele"]), hide_index=True)
+
+        if player_rank:
+            st.caption(f"Dein Rang: {player_rank[0]} von {player_rank[2]} (Bestwert {player_rank[1]})")
+
+    except Exception as e:
+        st.error(f"Datenbankfehler aufgetreten: {e}")
+
 
 # Ingame
 if st.session_state.game_started:
@@ -210,11 +288,27 @@ if st.session_state.game_started:
         st.metric("Dein Endergebnis", f"{final} / {max_p} Punkten")
         
         if not st.session_state.score_saved and st.session_state.player_id:
-            mode = f"{st.session_state.game_mode} ({st.session_state.difficulty_selection})"
+            mode = mode_key(st.session_state.game_mode, st.session_state.difficulty_selection)
             if st.session_state.player_id != None: 
                 db.save_score_to_db(final, st.session_state.rounds_per_game, mode, st.session_state.player_id)
                 st.session_state.score_saved = True
                 st.toast("Gespeichert!", icon="💾")
+
+                # Challenge-Ergebnis (nur das erste Spiel pro Spieler zählt)
+                if st.session_state.challenge_id is not None:
+                    counted = db.save_challenge_result(st.session_state.challenge_id, st.session_state.player_id, final, st.session_state.rounds_per_game)
+                    st.session_state.challenge_counted = counted
+
+        # Rang in der Challenge
+        if st.session_state.challenge_id is not None and st.session_state.player_id:
+            if not st.session_state.challenge_counted:
+                st.caption("Diese Challenge hast du schon gespielt, gewertet bleibt dein erstes Ergebnis.")
+            try:
+                challenge_rank = db.get_challenge_rank(st.session_state.challenge_id, st.session_state.player_id)
+                if challenge_rank:
+                    st.caption(f"Challenge-Rang: {challenge_rank[0]} von {challenge_rank[2]} ({challenge_rank[1]} Punkte)")
+            except Exception as e:
+                st.error(f"Datenbankfehler aufgetreten: {e}")
                 
             
         if final >= max_p * 0.9: st.markdown("### 🏆 Legende!")
@@ -248,86 +342,97 @@ if st.session_state.game_started:
         hint = city.get("clue", city["name"])
         st.markdown(f"Gesucht: **{hint}** ({label})")
 
-    # Anzeige der Karte abhängig von der Schwierigkeit
-    diff = st.session_state.difficulty_selection
-    
-    match diff:
-        case "Leicht":
-            # CartoDB PositronNoLabels: Klare politische Grenzen, grau, keine Namen
-            map_tiles = "CartoDB VoyagerNoLabels"
-            map_attr = '&copy; OpenStreetMap & CartoDB; Länderpolygone: Natural Earth 1:110m Cultural Vectors. Admin o - Countries.'
-    
-        case "Mittel":
-            # Esri World Physical: Physische Karte (betont Kontinente/Gebirge), 
-            # keine politischen Ländergrenzen, keine Namen
-            map_tiles = "https://server.arcgisonline.com/ArcGIS/rest/services/World_Shaded_Relief/MapServer/tile/{z}/{y}/{x}"
-            map_attr = 'Tiles &copy; Esri &mdash; Source: Esri; Länderpolygone: Natural Earth 1:110m Cultural Vectors. Admin o - Countries.'
-            
-        case "Schwer": # Schwer
-            # Esri WorldImagery: Satellitenbild, keine Grenzen, keine Namen
-            map_tiles = "Esri.WorldImagery"
-            map_attr = 'Tiles &copy; Esri &mdash; Source: Esri, i-cubed, USDA, USGS, AEX, GeoEye, Getmapping, Aerogrid, IGN, IGP, UPR-EGP, and the GIS User Community; Länderpolygone: Natural Earth 1:110m Cultural Vectors. Admin o - Countries.'
-
-    # Karte initialisieren 
-    m = folium.Map(
-        location=[20, 0], 
-        zoom_start=2, 
-        min_zoom=2,
-        max_zoom=6,
-        tiles=map_tiles,
-        attr=map_attr
-    )
-
-    # Marker, Linie und Polygon bei Ländern setzen
-    if st.session_state.turn_over and st.session_state.last_click:
+    # Marker, Linie und Polygon bei Ländern als Overlay (einmal pro Runde gebaut)
+    def build_overlay():
+        overlay = folium.FeatureGroup(name="Auflösung")
         # Marker für den eigenen Tipp
         guess_coord = (st.session_state.last_click['lat'], st.session_state.last_click['lng'])
         actual_coord = (city['lat'], city['lon'])
-        folium.Marker(guess_coord, popup="Dein Tipp", icon=folium.Icon(color="red", icon="user")).add_to(m)
- 
+        points = [guess_coord, actual_coord]
+        folium.Marker(guess_coord, popup="Dein Tipp", icon=folium.Icon(color="red", icon="user")).add_to(overlay)
+
         # Polylinie (wird nicht gesetzt, wenn der Spielmodus Länder ist und das Land genau getroffen wurde)
         if st.session_state.game_mode != "Länder" or st.session_state.current_dist != 0:
-            points = get_geodesic_path(guess_coord, actual_coord)
-            folium.PolyLine(points, color="blue", weight=2, opacity=0.8).add_to(m)
+            with span("render.path"):
+                segments = great_circle_path(guess_coord, actual_coord)
+                folium.PolyLine(segments, color="blue", weight=2, opacity=0.8).add_to(overlay)
 
         # Polygon bei Ländern
         if st.session_state.game_mode ==  "Länder":
-            geo_json_data = db.get_country_geojson(city['name'])
-            if geo_json_data:
-                gj = folium.GeoJson(geo_json_data, name="Lösung", style_function=lambda x: {'fillColor':'#228B22','color':'#006400','weight':2,'fillOpacity':0.4}, tooltip=city['name']).add_to(m)
-                bounds = gj.get_bounds()
-                m.fit_bounds([guess_coord, bounds])
-            else:
-                folium.Marker(actual_coord, popup=city['name'], icon=folium.Icon(color="green", icon="flag")).add_to(m)
+            with span("render.geojson_overlay"):
+                zoom = geojson_cache.zoom_for_bounds([guess_coord, actual_coord])
+                geo_json_data = city.get("geojson", {}).get(geojson_cache.level_for_zoom(zoom)) or db.get_country_geojson(city['name'], zoom)
+                if geo_json_data:
+                    gj = folium.GeoJson(geo_json_data, name="Lösung", style_function=lambda x: {'fillColor':'#228B22','color':'#006400','weight':2,'fillOpacity':0.4}, tooltip=city['name']).add_to(overlay)
+                    points.extend(gj.get_bounds())
+                else:
+                    folium.Marker(actual_coord, popup=city['name'], icon=folium.Icon(color="green", icon="flag")).add_to(overlay)
         # Marker für den tatsächlichen Standort, wenn keine Länder gesucht werden
         else:
-            folium.Marker(actual_coord, popup=city['name'], icon=folium.Icon(color="green", icon="star")).add_to(m)
-            m.fit_bounds([guess_coord, actual_coord])
-
-
-    # Karte rendern
-    map_key = f"map_round_{st.session_state.round}_{st.session_state.turn_over}" 
-    output = st_folium(m, width="100%", height=600, key=map_key)
+            folium.Marker(actual_coord, popup=city['name'], icon=folium.Icon(color="green", icon="star")).add_to(overlay)
+        return overlay, points
+
+    # Karte rendern: Grundkarte je Schwierigkeit, der Schlüssel bleibt über die ganze Runde gleich
+    map_key = f"map_round_{st.session_state.round}"
+    show_solution = st.session_state.turn_over and st.session_state.last_click
+    with span("render.st_folium"):
+        output = map_rendering.render_map(
+            st.session_state.difficulty_selection,
+            map_key,
+            overlay_key=(city['name'], st.session_state.last_click['lat'], st.session_state.last_click['lng']) if show_solution else None,
+            build_overlay=build_overlay if show_solution else None
+        )
 
     # Klick Verarbeitung
     if output['last_clicked'] and not st.session_state.turn_over:
         st.session_state.last_click = output['last_clicked']
         guess = (st.session_state.last_click['lat'], st.session_state.last_click['lng'])
         
-        # Berechnung in Python, wenn Städte, Berge oder Gebäude gesucht werden (Distanz ziwschen 2 Punkten)
-        if st.session_state.game_mode in ["Städte", "Berge", "Gebäude"]:
-            actual = (city['lat'], city['lon'])
-            st.session_state.current_dist = geodesic(guess, actual).kilometers
-
-        # Berechnung in PostgreSQL, wenn Länder gesucht werden (kürzeste Distanz zwischen Punkt und Polygon)
-        if st.session_state.game_mode == "Länder":
-            st.session_state.current_dist = db.calculate_dist_to_country(guess, city["name"])
-
-        # Berechnung des Scores
-        points = calculate_score(st.session_state.current_dist)
+        with span("score.click"):
+            # Land am Klickpunkt aus dem lokalen Index (englischer Name wie countries.name_en)
+            clicked_en = country_at(*guess)
+            st.session_state.clicked_country = db.get_country_names().get(clicked_en, clicked_en) if clicked_en else None
+
+            # Berechnung in Python, wenn Städte, Berge oder Gebäude gesucht werden (Distanz ziwschen 2 Punkten)
+            if st.session_state.game_mode in ["Städte", "Berge", "Gebäude"]:
+                actual = (city['lat'], city['lon'])
+                st.session_state.current_dist = geodesic(guess, actual).kilometers
+
+            # Berechnung der kürzesten Distanz zwischen Punkt und Polygon, wenn Länder gesucht werden (lokal, PostgreSQL als Fallback)
+            # Liegt der Klick im gesuchten Land, ist die Distanz 0 ohne weitere Berechnung
+            if st.session_state.game_mode == "Länder" and clicked_en and clicked_en == city.get("name_en"):
+                st.session_state.current_dist = 0
+            # Die Geometrie für die Auflösung wird gleichzeitig geladen
+            elif st.session_state.game_mode == "Länder":
+                zoom = geojson_cache.zoom_for_bounds([guess, (city['lat'], city['lon'])])
+                st.session_state.current_dist, geo_json_data = async_database.reveal_country(
+                    guess, city["name"], city.get("name_en"), city.get("geojson", {}).get(geojson_cache.MAX_ZOOM), zoom
+                )
+                if geo_json_data:
+                    city.setdefault("geojson", {})[geojson_cache.level_for_zoom(zoom)] = geo_json_data
+
+            # Berechnung des Scores
+            points = calculate_score(st.session_state.current_dist)
         
         st.session_state.current_round_score = points
         st.session_state.total_score += points
+
+        # Runde für Auswertungen protokollieren (gesammelt per COPY in round_guesses)
+        db.log_round_guess(
+            player=st.session_state.player_id,
+            game_mode=mode_key(st.session_state.game_mode, st.session_state.difficulty_selection),
+            challenge_id=st.session_state.challenge_id,
+            round=st.session_state.round,
+            location_table=table_and_difficulty()[0],
+            location_name=city["name"],
+            target_lat=city["lat"],
+            target_lon=city["lon"],
+            guess_lat=guess[0],
+            guess_lon=guess[1],
+            clicked_country=clicked_en,
+            distance_km=st.session_state.current_dist,
+            points=points
+        )
         st.session_state.turn_over = True
         st.rerun()
 
@@ -338,6 +443,8 @@ if st.session_state.game_started:
         c2.metric("Punkte diese Runde", f"+ {st.session_state.current_round_score}")
         c3.metric("Gesamtpunkte", st.session_state.total_score)
         
+        clicked = st.session_state.get("clicked_country")
+        st.caption(f"📍 Dein Tipp liegt in: **{clicked}**" if clicked else "📍 Dein Tipp liegt in keinem Land.")
         st.info(f"✅ Auflösung: **{city['name']}**\n\nℹ️ {city['info']}")
         
         btn_text = "Weiter"
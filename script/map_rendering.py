@@ -0,0 +1,224 @@
+# Kartendarstellung mit zwischengespeicherter Grundkarte und getrennt übertragenen Overlays
+#
+# Die Grundkarte (Kacheln je Schwierigkeit) wird einmal pro Prozess gebaut und serialisiert.
+# Tipp-Marker, Pfad und Lösung werden als FeatureGroup übertragen; die Komponente tauscht sie
+# auf der bestehenden Karte aus, ohne sie neu zu laden. Ausschnitt und Zoom der Auflösung
+# werden über center/zoom gesetzt statt über fit_bounds in der Grundkarte. Das serialisierte
+# Overlay liegt pro Runde in der Session, sodass weitere Reruns nichts neu rendern.
+# Mit CITY_GUESSER_TILE_SERVER kommen die Kacheln aus dem lokalen Kachelserver (tile_server.py).
+# Die internen Funktionen von streamlit-folium sind auf die Version in requirements.txt
+# abgestimmt; fehlen sie (andere Version), wird st_folium mit feature_group_to_add verwendet,
+# die Karte bleibt dann ebenfalls stehen, wird aber bei jedem Rerun neu gerendert.
+# Liegen Tipp und Lösung auf verschiedenen Seiten des 180. Längengrads, werden Ausschnitt und
+# Overlay mit Längengraden 0..360 dargestellt, statt die ganze Welt zu zeigen.
+
+import os
+
+import folium
+import streamlit as st
+import streamlit_folium
+from streamlit_folium import st_folium
+
+import geojson_cache
+import tile_server
+from instrumentation import span
+
+DEFAULT_CENTER = (20, 0)
+DEFAULT_ZOOM = 2
+
+NATURAL_EARTH_ATTR = "Länderpolygone: Natural Earth 1:110m Cultural Vectors. Admin o - Countries."
+
+# Kacheln und Quellenangabe je Schwierigkeit
+MAP_TILES = {
+    # CartoDB VoyagerNoLabels: Klare politische Grenzen, keine Namen
+    "Leicht": ("CartoDB VoyagerNoLabels", "&copy; OpenStreetMap & CartoDB; " + NATURAL_EARTH_ATTR),
+    # Esri World Shaded Relief: Physische Karte (betont Kontinente/Gebirge), keine politischen Ländergrenzen, keine Namen
+    "Mittel": (
+        "https://server.arcgisonline.com/ArcGIS/rest/services/World_Shaded_Relief/MapServer/tile/{z}/{y}/{x}",
+        "Tiles &copy; Esri &mdash; Source: Esri; " + NATURAL_EARTH_ATTR
+    ),
+    # Esri WorldImagery: Satellitenbild, keine Grenzen, keine Namen
+    "Schwer": (
+        "Esri.WorldImagery",
+        "Tiles &copy; Esri &mdash; Source: Esri, i-cubed, USDA, USGS, AEX, GeoEye, Getmapping, Aerogrid, IGN, IGP, UPR-EGP, "
+        "and the GIS User Community; " + NATURAL_EARTH_ATTR
+    )
+}
+
+# Eigener Kachelserver (script/tile_server.py), z. B. http://localhost:8600; ohne Angabe direkt vom Anbieter
+TILE_SERVER_URL = os.environ.get("CITY_GUESSER_TILE_SERVER", "")
+
+# Kachelsatz im Kachelserver je Schwierigkeit
+TILESETS = {
+    "Leicht": "voyager_nolabels",
+    "Mittel": "shaded_relief",
+    "Schwer": "world_imagery"
+}
+
+# Nur Klicks lösen einen Rerun aus, Verschieben und Zoomen der Karte nicht
+RETURNED_OBJECTS = ["last_clicked"]
+
+_INTERNALS = ("_component_func", "_get_html", "_get_header", "_get_map_string", "_get_feature_group_string",
+              "get_full_id", "generate_js_hash")
+USE_CACHED_PAYLOADS = all(hasattr(streamlit_folium, name) for name in _INTERNALS)
+
+
+def build_base_map(difficulty):
+    tiles, attr = MAP_TILES[difficulty]
+    if TILE_SERVER_URL:
+        tiles = tile_server.tile_url(TILE_SERVER_URL, TILESETS[difficulty])
+    return folium.Map(
+        location=list(DEFAULT_CENTER),
+        zoom_start=DEFAULT_ZOOM,
+        min_zoom=geojson_cache.MIN_ZOOM,
+        max_zoom=geojson_cache.MAX_ZOOM,
+        tiles=tiles,
+        attr=attr
+    )
+
+
+# CSS- und JS-Dateien aller Elemente (wie in st_folium)
+def _links(element):
+    css, js = [], []
+    stack = [element]
+    while stack:
+        current = stack.pop()
+        css.extend(href for _, href in getattr(current, "default_css", []))
+        js.extend(src for _, src in getattr(current, "default_js", []))
+        stack.extend(reversed(list(getattr(current, "_children", {}).values())))
+    return css, js
+
+
+# Serialisierte Grundkarte je Schwierigkeit, einmal pro Prozess
+@st.cache_resource
+def base_map_payload(difficulty):
+    with span("render.map_construction"):
+        m = build_base_map(difficulty)
+        m.get_root().render()
+        html = streamlit_folium._get_html(m)
+        header = streamlit_folium._get_header(m)
+        script = streamlit_folium._get_map_string(m)
+        css, js = _links(m)
+    return {
+        "script": script,
+        "header": header,
+        "html": html,
+        "id": streamlit_folium.get_full_id(m),
+        "css_links": list(dict.fromkeys(css)),
+        "js_links": list(dict.fromkeys(js))
+    }
+
+
+# True, wenn die Punkte mit Längengraden 0..360 statt -180..180 enger beieinander liegen, also
+# über den 180. Längengrad hinweg dargestellt werden sollten
+def wraps_antimeridian(points):
+    lons = [lon for _, lon in points]
+    shifted = [lon % 360.0 for lon in lons]
+    return max(shifted) - min(shifted) < max(lons) - min(lons)
+
+
+# Ausschnitt (center, zoom), der alle Punkte [(lat, lon), ...] zeigt, bei Bedarf über den 180. Längengrad
+def view_for_points(points):
+    wrap = wraps_antimeridian(points)
+    lats = [lat for lat, _ in points]
+    lons = [lon % 360.0 if wrap else lon for _, lon in points]
+    south_west, north_east = (min(lats), min(lons)), (max(lats), max(lons))
+    center = ((south_west[0] + north_east[0]) / 2, (south_west[1] + north_east[1]) / 2)
+    return center, geojson_cache.zoom_for_bounds([south_west, north_east])
+
+
+# Punkt [lat, lon] oder (verschachtelte) Liste davon mit Längengraden 0..360 (als Kopie)
+def _shift_locations(locations):
+    if locations and isinstance(locations[0], (int, float)):
+        return [locations[0], locations[1] % 360.0]
+    return [_shift_locations(item) for item in locations]
+
+# Koordinaten [lon, lat, ...] einer GeoJSON-Geometrie mit Längengraden 0..360 (als Kopie)
+def _shift_coordinates(coordinates):
+    if coordinates and isinstance(coordinates[0], (int, float)):
+        return [coordinates[0] % 360.0, *coordinates[1:]]
+    return [_shift_coordinates(c) for c in coordinates]
+
+def _shift_geojson(data):
+    if isinstance(data, dict):
+        return {k: _shift_coordinates(v) if k == "coordinates" else _shift_geojson(v) for k, v in data.items()}
+    if isinstance(data, list):
+        return [_shift_geojson(item) for item in data]
+    return data
+
+
+# Verschiebt Marker, Linien und GeoJSON des Overlays auf Längengrade 0..360, damit sie im
+# Ausschnitt über den 180. Längengrad liegen (Leaflet zeichnet sie nur an ihren Koordinaten)
+def _shift_overlay(feature_group):
+    for child in feature_group._children.values():
+        if isinstance(child, folium.Marker):
+            child.location = _shift_locations(child.location)
+        elif isinstance(child, folium.PolyLine):
+            child.locations = _shift_locations(child.locations)
+        elif isinstance(child, folium.GeoJson):
+            child.data = _shift_geojson(child.data)
+
+
+# Serialisiert eine FeatureGroup, ohne die Grundkarte zu verändern
+def _overlay_payload(feature_group):
+    scratch = folium.Map(tiles=None)
+    script = streamlit_folium._get_feature_group_string(feature_group, map=scratch, idx=0)
+    css, js = _links(feature_group)
+    return {"script": script, "css_links": css, "js_links": js}
+
+
+# Zeigt die Karte der Schwierigkeit mit optionalem Overlay und liefert die Klickdaten.
+# build_overlay() -> (FeatureGroup, Punkte für den Ausschnitt) wird nur aufgerufen, wenn sich
+# overlay_key gegenüber dem letzten Rerun geändert hat.
+def render_map(difficulty, key, overlay_key=None, build_overlay=None, height=600, width="100%"):
+    center, zoom = DEFAULT_CENTER, DEFAULT_ZOOM
+    overlay = None
+    if build_overlay is not None:
+        cached = st.session_state.get("map_overlay")
+        if cached and cached[0] == (key, overlay_key):
+            overlay = cached[1]
+        else:
+            with span("render.overlay"):
+                feature_group, points = build_overlay()
+                if wraps_antimeridian(points):
+                    _shift_overlay(feature_group)
+                center, zoom = view_for_points(points)
+                overlay = {"feature_group": feature_group, "center": center, "zoom": zoom}
+                if USE_CACHED_PAYLOADS:
+                    overlay["payload"] = _overlay_payload(feature_group)
+            st.session_state.map_overlay = ((key, overlay_key), overlay)
+        center, zoom = overlay["center"], overlay["zoom"]
+
+    if not USE_CACHED_PAYLOADS:
+        return st_folium(
+            build_base_map(difficulty), key=key, height=height, width=width, returned_objects=RETURNED_OBJECTS,
+            center=center, zoom=zoom, feature_group_to_add=overlay["feature_group"] if overlay else None
+        )
+
+    base = base_map_payload(difficulty)
+    css_links, js_links = base["css_links"], base["js_links"]
+    if overlay:
+        css_links = list(dict.fromkeys(css_links + overlay["payload"]["css_links"]))
+        js_links = list(dict.fromkeys(js_links + overlay["payload"]["js_links"]))
+
+    return streamlit_folium._component_func(
+        script=base["script"],
+        header=base["header"],
+        html=base["html"],
+        id=base["id"],
+        key=streamlit_folium.generate_js_hash(base["script"], key, False),
+        height=height,
+        width=width,
+        returned_objects=RETURNED_OBJECTS,
+        default={"last_clicked": None},
+        zoom=zoom,
+        center=center,
+        feature_group=overlay["payload"]["script"] if overlay else None,
+        return_on_hover=False,
+        layer_control=None,
+        pixelated=False,
+        css_links=css_links,
+        js_links=js_links,
+        on_change=None,
+        wrap_longitude=False
+    )
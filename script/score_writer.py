@@ -0,0 +1,196 @@
+# Asynchrones Speichern der Spielergebnisse (Write-Behind)
+#
+# save_score_to_db legt Ergebnisse nur in eine Warteschlange. Ein Hintergrund-Thread schreibt
+# sie gesammelt: ein INSERT mit execute_values für game_history und ein UPDATE pro Batch, das
+# die played_games-Erhöhungen je Spieler zusammenfasst (nach ID sortiert, um Deadlocks zu vermeiden).
+# Batches mit Verbindungsfehlern werden mit Backoff wiederholt; bei anderen Fehlern oder nach den
+# Wiederholungen wird zeilenweise geschrieben: Zeilen, die selbst fehlschlagen (z. B. Fremdschlüssel
+# verletzt), werden protokolliert und verworfen (dead_letters), damit sie nachfolgende Ergebnisse
+# nicht blockieren. Nur bei Verbindungsfehlern bleiben die Zeilen für den nächsten Durchlauf
+# liegen. Beim Beenden wird alles geschrieben.
+
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+import instrumentation
+
+logger = logging.getLogger(__name__)
+
+INSERT_HISTORY = "INSERT INTO game_history (game_mode, score, rounds, player, played_at) VALUES %s"
+UPDATE_PLAYED_GAMES = """
+    UPDATE players AS p SET played_games = p.played_games + v.games
+    FROM (VALUES %s) AS v(id, games)
+    WHERE p.id = v.id
+"""
+
+
+class ScoreWriter:
+    def __init__(self, connection, batch_size=200, flush_interval=1.0, max_queue=10000,
+                 max_retries=5, retry_backoff=0.5, submit_timeout=2.0, on_written=None, thread_name="score-writer",
+                 transient_errors=(psycopg2.OperationalError, psycopg2.InterfaceError)):
+        self.connection = connection
+        self.transient_errors = transient_errors
+        self.on_written = on_written
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.submit_timeout = submit_timeout
+
+        self._queue = queue.Queue(max_queue)
+        self._pending = []
+        self._stop = threading.Event()
+        self._done = threading.Condition()
+        self._submitted = 0
+        # Geschriebene und verworfene Zeilen (für flush)
+        self._written = 0
+        self._stats = {
+            "batches": 0,
+            "rows": 0,
+            "retries": 0,
+            "failed_batches": 0,
+            "dead_letters": 0,
+            "dropped": 0,
+            "flush_latency_last": 0.0,
+            "flush_latency_max": 0.0,
+            "flush_latency_total": 0.0
+        }
+
+        self._thread = threading.Thread(target=self._run, name=thread_name, daemon=True)
+        self._thread.start()
+
+    # Legt eine Zeile in die Warteschlange (wirft queue.Full, wenn sie voll bleibt)
+    def _enqueue(self, row):
+        if self._stop.is_set():
+            raise RuntimeError(f"{type(self).__name__} ist beendet")
+        self._queue.put(row, timeout=self.submit_timeout)
+        with self._done:
+            self._submitted += 1
+
+    # Legt ein Ergebnis in die Warteschlange
+    def submit(self, score, rounds, game_mode, player_id):
+        self._enqueue((game_mode, score, rounds, player_id, datetime.now()))
+
+    @instrumentation.timed("db.score_writer_batch")
+    def _write_batch(self, batch):
+        games = Counter(row[3] for row in batch)
+        with self.connection() as conn, conn.cursor() as cur:
+            execute_values(cur, INSERT_HISTORY, batch)
+            execute_values(cur, UPDATE_PLAYED_GAMES, sorted(games.items()))
+
+    # Schreibt den Batch, bei Verbindungsfehlern mit Wiederholungen; True bei Erfolg. Andere
+    # Fehler (z. B. eine ungültige Zeile) werden nicht wiederholt.
+    def _write_with_retries(self, batch):
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._write_batch(batch)
+                return True
+            except self.transient_errors:
+                logger.exception("Speichern von %d Ergebnissen fehlgeschlagen (Versuch %d)", len(batch), attempt + 1)
+                if attempt == self.max_retries or self._stop.wait(self.retry_backoff * 2 ** attempt):
+                    return False
+                self._stats["retries"] += 1
+            except Exception:
+                logger.exception("Speichern von %d Ergebnissen fehlgeschlagen, schreibe zeilenweise", len(batch))
+                return False
+
+    # Schreibt die Zeilen einzeln; liefert (geschrieben, liegen geblieben). Zeilen mit eigenem
+    # Fehler werden verworfen, ab dem ersten Verbindungsfehler bleibt der Rest liegen.
+    def _write_rows(self, batch):
+        written = []
+        for i, row in enumerate(batch):
+            try:
+                self._write_batch([row])
+                written.append(row)
+            except self.transient_errors:
+                logger.exception("Verbindungsfehler, %d Ergebnisse bleiben liegen", len(batch) - i)
+                return written, batch[i:]
+            except Exception:
+                logger.exception("Ergebnis verworfen: %r", row)
+                self._stats["dead_letters"] += 1
+                with self._done:
+                    self._written += 1
+                    self._done.notify_all()
+        return written, []
+
+    # Schreibt den Batch; liefert die Zeilen, die für den nächsten Durchlauf liegen bleiben
+    def _flush(self, batch):
+        start = time.monotonic()
+        written, pending = batch, []
+        if not self._write_with_retries(batch):
+            self._stats["failed_batches"] += 1
+            written, pending = self._write_rows(batch)
+        if not written:
+            return pending
+
+        latency = time.monotonic() - start
+        self._stats["batches"] += 1
+        self._stats["rows"] += len(written)
+        self._stats["flush_latency_last"] = latency
+        self._stats["flush_latency_max"] = max(self._stats["flush_latency_max"], latency)
+        self._stats["flush_latency_total"] += latency
+        # Z. B. Invalidierung des Historien-Caches der betroffenen Spieler
+        if self.on_written:
+            try:
+                self.on_written({row[3] for row in written})
+            except Exception:
+                logger.exception("on_written fehlgeschlagen")
+
+        with self._done:
+            self._written += len(written)
+            self._done.notify_all()
+        return pending
+
+    def _drain(self, wait):
+        batch = self._pending
+        self._pending = []
+        try:
+            if not batch:
+                batch.append(self._queue.get(timeout=wait))
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._drain(self.flush_interval)
+            pending = self._flush(batch) if batch else []
+            if pending:
+                self._pending = pending
+                self._stop.wait(self.flush_interval)
+
+        # Beim Beenden alles Verbleibende schreiben
+        while True:
+            batch = self._drain(0)
+            if not batch:
+                break
+            pending = self._flush(batch)
+            if pending:
+                self._stats["dropped"] += len(pending) + self._queue.qsize()
+                logger.error("%d Ergebnisse konnten beim Beenden nicht gespeichert werden", self._stats["dropped"])
+                break
+
+    # Wartet, bis alle bisher übergebenen Ergebnisse geschrieben sind
+    def flush(self, timeout=None):
+        with self._done:
+            target = self._submitted
+            return self._done.wait_for(lambda: self._written >= target, timeout)
+
+    def close(self, timeout=10.0):
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def stats(self):
+        stats = dict(self._stats)
+        stats["queue_depth"] = self._queue.qsize() + len(self._pending)
+        stats["flush_latency_avg"] = stats["flush_latency_total"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
\ No newline at end of file
@@ -0,0 +1,109 @@
+# Punktberechnung für einzelne Klicks und vektorisiert für viele (Tipp, Ziel)-Paare
+#
+# Distanzmodi der Batch-API:
+#   "haversine":  Kugel mit mittlerem Erdradius, Abweichung zu geopy.geodesic bis ca. 0,6 %
+#   "ellipsoid":  Vincenty auf WGS84 (wie geopy), Abweichung zu geopy.geodesic < 0,1 mm;
+#                 nicht konvergierende, fast antipodale Paare werden mit geopy (Karney) berechnet
+
+import numpy as np
+from geopy.distance import EARTH_RADIUS, geodesic
+
+LIMIT_KM = 1000.0
+MAX_POINTS = 10.0
+
+# WGS84
+WGS84_A = 6378.137
+WGS84_F = 1 / 298.257223563
+WGS84_B = WGS84_A * (1 - WGS84_F)
+
+VINCENTY_MAX_ITER = 200
+VINCENTY_TOLERANCE = 1e-12
+
+
+# Berechnet die Punkte basierend auf der Distanz zum tatsächlichen Standort
+def calculate_score(distance_km):
+    limit_km = LIMIT_KM
+    max_points = MAX_POINTS
+    if distance_km >= limit_km:
+        return 0
+    points = (1 - (distance_km / limit_km)) * max_points
+    return int(round(points))
+
+
+# Vektorisierte Variante von calculate_score (gleiche Grenze und Rundung, half-to-even wie round())
+def batch_scores(distances_km):
+    distances_km = np.asarray(distances_km, dtype=np.float64)
+    points = np.round((1 - (distances_km / LIMIT_KM)) * MAX_POINTS)
+    return np.where(distances_km >= LIMIT_KM, 0, points).astype(np.int64)
+
+
+# Großkreisdistanz in km, Eingaben in Grad
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype=np.float64)) for x in (lat1, lon1, lat2, lon2))
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+
+# Ellipsoidische Distanz in km (inverse Vincenty-Formel, alle Paare gleichzeitig iteriert)
+def ellipsoid_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(*(np.atleast_1d(np.asarray(x, dtype=np.float64)) for x in (lat1, lon1, lat2, lon2)))
+    f = WGS84_F
+
+    u1 = np.arctan((1 - f) * np.tan(np.radians(lat1)))
+    u2 = np.arctan((1 - f) * np.tan(np.radians(lat2)))
+    big_l = np.radians(lon2 - lon1)
+    big_l = (big_l + np.pi) % (2 * np.pi) - np.pi
+    sin_u1, cos_u1 = np.sin(u1), np.cos(u1)
+    sin_u2, cos_u2 = np.sin(u2), np.cos(u2)
+
+    lam = big_l.copy()
+    converged = np.zeros(lam.shape, dtype=bool)
+    sin_sigma = cos_sigma = sigma = cos_sq_alpha = cos_2sigma_m = np.zeros(lam.shape)
+
+    for _ in range(VINCENTY_MAX_ITER):
+        sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+        sin_sigma = np.hypot(cos_u2 * sin_lam, cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam)
+        cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lam
+        sigma = np.arctan2(sin_sigma, cos_sigma)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            sin_alpha = np.where(sin_sigma == 0, 0.0, cos_u1 * cos_u2 * sin_lam / sin_sigma)
+            cos_sq_alpha = 1 - sin_alpha ** 2
+            # Auf dem Äquator ist cos_sq_alpha = 0
+            cos_2sigma_m = np.where(cos_sq_alpha == 0, 0.0, cos_sigma - 2 * sin_u1 * sin_u2 / cos_sq_alpha)
+        c = f / 16 * cos_sq_alpha * (4 + f * (4 - 3 * cos_sq_alpha))
+        lam_new = big_l + (1 - c) * f * sin_alpha * (
+            sigma + c * sin_sigma * (cos_2sigma_m + c * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2))
+        )
+        converged = np.abs(lam_new - lam) < VINCENTY_TOLERANCE
+        lam = np.where(converged, lam, lam_new)
+        if converged.all():
+            break
+
+    u_sq = cos_sq_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+    big_a = 1 + u_sq / 16384 * (4096 + u_sq * (-768 + u_sq * (320 - 175 * u_sq)))
+    big_b = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+    delta_sigma = big_b * sin_sigma * (cos_2sigma_m + big_b / 4 * (
+        cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+        - big_b / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)
+    ))
+    distances = WGS84_B * big_a * (sigma - delta_sigma)
+
+    # Fast antipodale Paare konvergieren nicht und werden einzeln mit geopy berechnet
+    for index in zip(*np.nonzero(~converged)):
+        distances[index] = geodesic((lat1[index], lon1[index]), (lat2[index], lon2[index])).kilometers
+
+    return distances
+
+
+# Distanzen und Punkte für Arrays von Tipps und Zielen mit Form (n, 2) als (lat, lon)
+def score_batch(guesses, targets, mode="ellipsoid"):
+    guesses = np.asarray(guesses, dtype=np.float64)
+    targets = np.asarray(targets, dtype=np.float64)
+
+    match mode:
+        case "haversine": distance = haversine_km
+        case "ellipsoid": distance = ellipsoid_km
+        case _: raise ValueError(f"Unbekannter Distanzmodus: {mode}")
+
+    distances_km = distance(guesses[..., 0], guesses[..., 1], targets[..., 0], targets[..., 1])
+    return distances_km, batch_scores(distances_km)
\ No newline at end of file
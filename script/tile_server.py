@@ -0,0 +1,308 @@
+# Kachelserver mit MBTiles-Speicher für die Kachelsätze der Schwierigkeiten
+#
+# Liefert /tiles/<kachelsatz>/<z>/<x>/<y>.png aus je einer MBTiles-Datei (SQLite, Zeilen im
+# TMS-Schema) in TILE_DIR. Fehlt eine Kachel, wird sie beim Anbieter geholt, gespeichert und
+# ausgeliefert (read-through); mit --offline gibt es dann 404 und keine Verbindung nach außen.
+# Antworten tragen Cache-Control und ETag, If-None-Match wird mit 304 beantwortet.
+# "seed" lädt die Zoomstufen der Karte (MIN_ZOOM bis MAX_ZOOM, rund 5500 Kacheln je Satz) vorab,
+# danach läuft der Server vollständig offline. Bei den Anbietern gelten deren Nutzungsbedingungen.
+# Die Anbieter-URLs lassen sich mit --upstream name=url oder CITY_GUESSER_TILE_UPSTREAM_<NAME>
+# ersetzen, z. B. durch einen lokalen Ersatzserver (benchmark/tile_server_check.py).
+# Die Karten verwenden den Server, wenn CITY_GUESSER_TILE_SERVER gesetzt ist (map_rendering.py).
+#
+# Beispiel (aus dem Projektverzeichnis):
+#   python script/tile_server.py seed
+#   python script/tile_server.py serve --port 8600 --offline
+#   CITY_GUESSER_TILE_SERVER=http://localhost:8600 streamlit run script/main.py
+
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from geojson_cache import MAX_ZOOM, MIN_ZOOM
+
+TILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "tiles")
+
+# Kachelsatz -> URL-Vorlage beim Anbieter ({s} Subdomain, {z}/{x}/{y} im XYZ-Schema)
+TILESETS = {
+    "voyager_nolabels": "https://{s}.basemaps.cartocdn.com/rastertiles/voyager_nolabels/{z}/{x}/{y}.png",
+    "shaded_relief": "https://server.arcgisonline.com/ArcGIS/rest/services/World_Shaded_Relief/MapServer/tile/{z}/{y}/{x}",
+    "world_imagery": "https://server.arcgisonline.com/ArcGIS/rest/services/World_Imagery/MapServer/tile/{z}/{y}/{x}"
+}
+SUBDOMAINS = "abcd"
+
+# Kacheln ändern sich praktisch nie; Browser dürfen sie eine Woche behalten
+CACHE_MAX_AGE = 7 * 24 * 3600
+USER_AGENT = "city-guesser-tile-cache/1.0"
+
+TILE_PATH = re.compile(r"^/tiles/([a-z_]+)/(\d+)/(\d+)/(\d+)(?:\.(?:png|jpg|jpeg))?$")
+
+
+# URL einer Kachel auf diesem Server in der Schreibweise von Leaflet/folium
+def tile_url(server_url, tileset):
+    return f"{server_url.rstrip('/')}/tiles/{tileset}/{{z}}/{{x}}/{{y}}.png"
+
+
+# Anbieter-URLs mit Ersetzungen aus der Umgebung und der Kommandozeile ({"name": "url"})
+def upstreams(overrides=None):
+    result = dict(TILESETS)
+    for name in TILESETS:
+        url = os.environ.get(f"CITY_GUESSER_TILE_UPSTREAM_{name.upper()}")
+        if url:
+            result[name] = url
+    result.update(overrides or {})
+    return result
+
+
+def content_type(data):
+    if data.startswith(b"\x89PNG"):
+        return "image/png"
+    if data.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    return "application/octet-stream"
+
+
+class MBTiles:
+    def __init__(self, path, name):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB)"
+            )
+            self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS tile_index ON tiles (zoom_level, tile_column, tile_row)")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO metadata (name, value) VALUES (?, ?)",
+                [("name", name), ("type", "baselayer"), ("version", "1"), ("format", "png"),
+                 ("minzoom", str(MIN_ZOOM)), ("maxzoom", str(MAX_ZOOM))]
+            )
+            self._jpeg = self._conn.execute("SELECT value FROM metadata WHERE name = 'format'").fetchone()[0] == "jpg"
+
+    # MBTiles zählt die Zeilen von Süden (TMS), Leaflet von Norden (XYZ)
+    @staticmethod
+    def _row(z, y):
+        return (1 << z) - 1 - y
+
+    def get(self, z, x, y):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                (z, x, self._row(z, y))
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, z, x, y, data):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tiles (zoom_level, tile_column, tile_row, tile_data) VALUES (?, ?, ?, ?)",
+                (z, x, self._row(z, y), sqlite3.Binary(data))
+            )
+            if data.startswith(b"\xff\xd8") and not self._jpeg:
+                self._conn.execute("UPDATE metadata SET value = 'jpg' WHERE name = 'format'")
+                self._jpeg = True
+
+    # Vorhandene Kacheln einer Zoomstufe als Menge (x, y)
+    def existing(self, z):
+        with self._lock:
+            rows = self._conn.execute("SELECT tile_column, tile_row FROM tiles WHERE zoom_level = ?", (z,)).fetchall()
+        return {(x, self._row(z, row)) for x, row in rows}
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM tiles").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class TileStore:
+    def __init__(self, tile_dir=TILE_DIR, upstream_urls=None, offline=False, timeout=10.0):
+        self.tile_dir = tile_dir
+        self.upstream_urls = upstream_urls or upstreams()
+        self.offline = offline
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._tilesets = {}
+        self._stats = {"hits": 0, "misses": 0, "upstream_fetches": 0, "upstream_errors": 0, "upstream_time": 0.0}
+        os.makedirs(tile_dir, exist_ok=True)
+
+    def tileset(self, name):
+        with self._lock:
+            if name not in self._tilesets:
+                self._tilesets[name] = MBTiles(os.path.join(self.tile_dir, f"{name}.mbtiles"), name)
+            return self._tilesets[name]
+
+    def _count(self, key, value=1):
+        with self._lock:
+            self._stats[key] += value
+
+    # Kachel vom Anbieter; None, wenn es sie dort nicht gibt
+    def fetch(self, name, z, x, y):
+        url = self.upstream_urls[name].format(s=SUBDOMAINS[(x + y) % len(SUBDOMAINS)], z=z, x=x, y=y)
+        request = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                data = response.read()
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return None
+            self._count("upstream_errors")
+            raise
+        except Exception:
+            self._count("upstream_errors")
+            raise
+        finally:
+            self._count("upstream_time", time.perf_counter() - start)
+        self._count("upstream_fetches")
+        return data
+
+    # Kachel aus der MBTiles-Datei, bei Bedarf vom Anbieter nachgeladen; None, wenn es sie nicht gibt
+    def tile(self, name, z, x, y):
+        if name not in self.upstream_urls or not 0 <= z <= MAX_ZOOM or not (0 <= x < 1 << z and 0 <= y < 1 << z):
+            return None
+        tileset = self.tileset(name)
+        data = tileset.get(z, x, y)
+        if data is not None:
+            self._count("hits")
+            return data
+
+        self._count("misses")
+        if self.offline:
+            return None
+        data = self.fetch(name, z, x, y)
+        if data:
+            tileset.put(z, x, y, data)
+        return data
+
+    # Lädt alle fehlenden Kacheln der Zoomstufen; liefert (geladen, vorhanden, fehlgeschlagen)
+    def seed(self, name, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM, workers=8):
+        tileset = self.tileset(name)
+        missing, present = [], 0
+        for z in range(min_zoom, max_zoom + 1):
+            existing = tileset.existing(z)
+            present += len(existing)
+            missing.extend((z, x, y) for x in range(1 << z) for y in range(1 << z) if (x, y) not in existing)
+
+        def load(tile):
+            z, x, y = tile
+            data = self.fetch(name, z, x, y)
+            if data:
+                tileset.put(z, x, y, data)
+            return bool(data)
+
+        loaded, failed = 0, 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(load, tile) for tile in missing]
+            for future in futures:
+                try:
+                    loaded += future.result()
+                except Exception:
+                    failed += 1
+        return loaded, present, failed
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            tilesets = dict(self._tilesets)
+        for name, tileset in tilesets.items():
+            stats[f"tiles_{name}"] = tileset.count()
+        return stats
+
+    def close(self):
+        with self._lock:
+            for tileset in self._tilesets.values():
+                tileset.close()
+            self._tilesets.clear()
+
+
+def make_server(store, host="", port=8600, max_age=CACHE_MAX_AGE):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            match = TILE_PATH.match(self.path.split("?")[0])
+            if not match:
+                self.send_error(404)
+                return
+            name, z, x, y = match.group(1), *map(int, match.group(2, 3, 4))
+            try:
+                data = store.tile(name, z, x, y)
+            except Exception:
+                self.send_error(502, "Anbieter nicht erreichbar")
+                return
+            if data is None:
+                self.send_error(404)
+                return
+
+            etag = f'"{hashlib.sha1(data).hexdigest()[:20]}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", f"public, max-age={max_age}")
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", content_type(data))
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("Cache-Control", f"public, max-age={max_age}")
+            self.send_header("ETag", etag)
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kachelserver mit MBTiles-Speicher")
+    parser.add_argument("command", choices=["serve", "seed"])
+    parser.add_argument("--tile-dir", default=TILE_DIR)
+    parser.add_argument("--upstream", action="append", default=[], metavar="NAME=URL", help="Anbieter-URL eines Kachelsatzes ersetzen")
+    parser.add_argument("--tilesets", nargs="+", choices=TILESETS, default=list(TILESETS), help="nur für seed")
+    parser.add_argument("--min-zoom", type=int, default=MIN_ZOOM)
+    parser.add_argument("--max-zoom", type=int, default=MAX_ZOOM)
+    parser.add_argument("--workers", type=int, default=8, help="parallele Downloads beim Seeden")
+    parser.add_argument("--host", default="")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--offline", action="store_true", help="nur aus den MBTiles-Dateien ausliefern")
+    args = parser.parse_args()
+
+    overrides = dict(item.split("=", 1) for item in args.upstream)
+    store = TileStore(args.tile_dir, upstreams(overrides), offline=args.offline)
+
+    if args.command == "seed":
+        for name in args.tilesets:
+            start = time.perf_counter()
+            loaded, present, failed = store.seed(name, args.min_zoom, args.max_zoom, args.workers)
+            print(f"{name:18s} neu {loaded:6d}  vorhanden {present:6d}  fehlgeschlagen {failed:4d}  "
+                  f"{time.perf_counter() - start:.1f} s")
+        store.close()
+        return
+
+    server = make_server(store, args.host, args.port)
+    print(f"Kachelserver auf Port {args.port} ({'offline' if args.offline else 'read-through'}), Daten in {os.path.normpath(args.tile_dir)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        store.close()
+
+
+if __name__ == "__main__":
+    main()